@@ -0,0 +1 @@
+../travis/lint_server.py
\ No newline at end of file
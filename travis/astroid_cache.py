@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of astroid trees of the modules inferred by pylint.
+The odoo server and the dependency addons don't change between lint runs
+of the same version, so their trees are saved in disk (pickle) the first
+time they are built and loaded from disk in next runs.
+The modules of the linted paths are always parsed.
+"""
+
+from __future__ import print_function
+
+import cPickle
+import hashlib
+import os
+import sys
+
+from astroid import MANAGER, __pkginfo__
+
+
+class AstroidDiskCache(object):
+    def __init__(self, cache_dir, version, exclude_paths=None):
+        """
+        :param cache_dir: Directory to save the trees
+        :param version: String with odoo version to separate the caches
+        :param exclude_paths: List of paths of modules to parse always
+        """
+        self.cache_dir = os.path.join(
+            os.path.expanduser(cache_dir), version or 'default',
+            'astroid-%s' % __pkginfo__.version)
+        self.exclude_paths = [os.path.realpath(path) + os.sep
+                              for path in exclude_paths or []]
+        self._ast_from_file = None
+        self._patched = False
+
+    def get_cache_file(self, filepath):
+        """Get the cache file of a module, its name changes when
+        the module file changes."""
+        stat = os.stat(filepath)
+        key = '%s:%s:%s' % (filepath, stat.st_mtime, stat.st_size)
+        return os.path.join(self.cache_dir,
+                            hashlib.sha1(key).hexdigest() + '.pickle')
+
+    def is_excluded(self, filepath):
+        filepath = os.path.realpath(filepath)
+        return any(filepath.startswith(path) for path in self.exclude_paths)
+
+    def load(self, cache_file):
+        try:
+            with open(cache_file, 'rb') as fcache:
+                return cPickle.load(fcache)
+        except Exception:
+            return None
+
+    def dump(self, cache_file, module):
+        # Trees are deep structures
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(recursion_limit, 100000))
+        tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp_file, 'wb') as fcache:
+                cPickle.dump(module, fcache, cPickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_file, cache_file)
+        except Exception:
+            # Trees with references to functions (e.g. inference tips of
+            # astroid brain plugins) can't be saved, they are parsed always
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
+    def ast_from_file(self, filepath, modname=None, fallback=True,
+                      source=False):
+        """Wrapper of `AstroidManager.ast_from_file` using the cache"""
+        cached = modname in MANAGER.astroid_cache and \
+            MANAGER.astroid_cache[modname].file == filepath
+        if source or cached or not filepath or \
+                not filepath.endswith('.py') or self.is_excluded(filepath):
+            return self._ast_from_file(filepath, modname, fallback, source)
+        cache_file = self.get_cache_file(filepath)
+        module = self.load(cache_file)
+        if module is not None:
+            MANAGER.cache_module(module)
+            return module
+        module = self._ast_from_file(filepath, modname, fallback, source)
+        self.dump(cache_file, module)
+        return module
+
+    def __enter__(self):
+        # Other wrappers of the method can be active
+        self._patched = 'ast_from_file' in vars(MANAGER)
+        self._ast_from_file = MANAGER.ast_from_file
+        MANAGER.ast_from_file = self.ast_from_file
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._patched:
+            MANAGER.ast_from_file = self._ast_from_file
+        else:
+            del MANAGER.ast_from_file
+        self._ast_from_file = None
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Pool of test databases cloned from a template database in background.
+`createdb -T` and `dropdb` are run out of the critical path of the
+test loop: the next databases are cloned while a module is tested, and
+used databases are dropped while the next module is tested.
+"""
+
+from __future__ import print_function
+
+import os
+import Queue
+import shutil
+import subprocess
+import threading
+
+
+def get_filestore_dir(data_dir, dbname):
+    return os.path.join(os.path.expanduser(data_dir), 'filestore', dbname)
+
+
+def copy_attachments(dbtemplate, dbdest, data_dir):
+    attach_tmpl_dir = get_filestore_dir(data_dir, dbtemplate)
+    attach_dest_dir = get_filestore_dir(data_dir, dbdest)
+    if os.path.isdir(attach_tmpl_dir) and not os.path.isdir(attach_dest_dir):
+        print("copy", attach_tmpl_dir, attach_dest_dir)
+        shutil.copytree(attach_tmpl_dir, attach_dest_dir)
+
+
+def drop_database(dbname, data_dir):
+    """Drop a database and its filestore
+    :return: Integer with return code of `dropdb`
+    """
+    with open(os.devnull, 'w') as devnull:
+        res = subprocess.call(['dropdb', dbname], stderr=devnull)
+    shutil.rmtree(get_filestore_dir(data_dir, dbname), ignore_errors=True)
+    return res
+
+
+class DbPool(object):
+    def __init__(self, template, count, size=2, data_dir='~/data_dir',
+                 prefix='openerp_test', governor=None):
+        """
+        :param template: Name of template database to clone
+        :param count: Number of databases that will be requested
+        :param size: Number of ready databases to keep ahead
+        :param data_dir: Odoo data_dir with the filestore of databases
+        :param prefix: Prefix of name of databases created
+        :param governor: governor.Governor object to delay the clones
+            while the memory is low
+        """
+        self.template = template
+        self.count = count
+        self.data_dir = data_dir
+        self.prefix = prefix
+        self.governor = governor
+        self._ready = Queue.Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._droppers = []
+        self._closed = threading.Event()
+        self._filler = threading.Thread(target=self._fill)
+        self._filler.daemon = True
+
+    def start(self):
+        self._filler.start()
+        return self
+
+    def _fill(self):
+        # Clones are created one by one because postgresql don't allow
+        # to use a template database with other sessions connected.
+        for index in range(self.count):
+            self._slots.acquire()
+            if self._closed.is_set():
+                break
+            if self.governor and index:
+                # The next clone waits for the tests of the current one
+                self.governor.wait_for_memory(stop=self._closed)
+                if self._closed.is_set():
+                    break
+            dbname = '%s_%d' % (self.prefix, index)
+            try:
+                # Remove leftovers of a previous run
+                drop_database(dbname, self.data_dir)
+                subprocess.call(['createdb', '-T', self.template, dbname])
+                copy_attachments(self.template, dbname, self.data_dir)
+            finally:
+                self._ready.put(dbname)
+
+    def acquire(self):
+        """Get the next ready database, waiting for it if necessary.
+        :return: String with name of database
+        """
+        dbname = self._ready.get()
+        self._slots.release()
+        return dbname
+
+    def release(self, dbname):
+        """Drop a used database in background"""
+        dropper = threading.Thread(target=drop_database,
+                                   args=(dbname, self.data_dir))
+        dropper.start()
+        self._droppers.append(dropper)
+
+    def close(self):
+        """Drop the databases not used and wait for pending drops"""
+        self._closed.set()
+        try:
+            # Wake up the filler if it's waiting for a free slot
+            self._slots.release()
+        except ValueError:
+            pass
+        self._filler.join()
+        while not self._ready.empty():
+            self.release(self._ready.get())
+        for dropper in self._droppers:
+            dropper.join()
+        self._droppers = []
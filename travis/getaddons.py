@@ -7,6 +7,7 @@ With -m flag, will return a list of modules names instead.
 
 from __future__ import print_function
 import ast
+import json
 import os
 import sys
 
@@ -73,17 +74,47 @@ def get_addons(path):
 
 def get_modules_changed(path, ref='HEAD'):
     '''Get modules changed from git diff-index {ref}
+    For a remote branch `remote/branch` the diff is done with the merge base
+    of HEAD and the branch, fetched with a shallow history. In a travis job
+    the modules changed are saved in the git directory for the next calls of
+    the job, with the tree of the index, HEAD and the job id.
     :param path: String path of git repo
     :param ref: branch or remote/branch or sha to compare
     :return: List of paths of modules changed
     '''
-    git_run_obj = GitRun(os.path.join(path, '.git'))
+    git_dir = os.path.join(path, '.git')
+    git_run_obj = GitRun(git_dir)
+    cache_path = os.path.join(git_dir, 'modules_changed.json')
+    cache_key = None
+    job_id = os.environ.get('TRAVIS_JOB_ID')
+    if ref != 'HEAD' and job_id:
+        # The index is compared with HEAD by the git hook, so it's not
+        # cached. The remote branch can move between jobs, so the cache
+        # is only used by one job.
+        cache_key = ' '.join([
+            job_id, git_run_obj.run(['rev-parse', 'HEAD']),
+            git_run_obj.run(['write-tree']), ref])
+        try:
+            with open(cache_path) as fcache:
+                cache = json.load(fcache)
+        except (IOError, ValueError):
+            cache = {}
+        if cache_key in cache:
+            return cache[cache_key]
     if ref != 'HEAD':
-        fetch_ref = ref
-        if ':' not in fetch_ref:
-            # to force create branch
-            fetch_ref += ':' + fetch_ref
-        git_run_obj.run(['fetch'] + fetch_ref.split('/', 1))
+        if '/' in ref and ':' not in ref:
+            remote, branch = ref.split('/', 1)
+            merge_base = git_run_obj.get_merge_base(remote, branch)
+            if not merge_base:
+                raise ValueError("Merge base of HEAD and %s not found, the "
+                                 "modules changed can't be computed" % ref)
+            ref = merge_base
+        else:
+            fetch_ref = ref
+            if ':' not in fetch_ref:
+                # to force create branch
+                fetch_ref += ':' + fetch_ref
+            git_run_obj.run(['fetch'] + fetch_ref.split('/', 1))
     items_changed = git_run_obj.get_items_changed(ref)
     folders_changed = set([
         item_changed.split('/')[0]
@@ -95,6 +126,9 @@ def get_modules_changed(path, ref='HEAD'):
     modules_changed_path = [
         os.path.join(path, module_changed)
         for module_changed in modules_changed]
+    if cache_key:
+        with open(cache_path, 'w') as fcache:
+            json.dump({cache_key: modules_changed_path}, fcache)
     return modules_changed_path
 
 
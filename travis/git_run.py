@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
+from __future__ import print_function
+
+import os
 import subprocess
+import sys
 
 
 class GitRun(object):
@@ -41,3 +45,46 @@ class GitRun(object):
         command = ['rev-parse', '--abbrev-ref', 'HEAD']
         res = self.run(command)
         return res
+
+    def is_shallow(self):
+        """:return: True if the repository is a shallow clone"""
+        return os.path.isfile(os.path.join(self.repo_path, 'shallow'))
+
+    def fetch(self, remote, refspec, options=None):
+        """Fetch a refspec of a remote, showing an error if it fails
+        :param options: List of strings with options of the fetch
+        :return: True if the fetch succeeded
+        """
+        command = ['fetch'] + (options or []) + [remote, refspec]
+        if self.run(command) is None:
+            # The output of the command is read by the callers
+            print("Failed git %s" % ' '.join(command), file=sys.stderr)
+            return False
+        return True
+
+    def get_merge_base(self, remote, branch, depth=50, max_depth=1600):
+        """Fetch a branch of a remote and get its merge base with HEAD.
+        In shallow clones the branch is fetched with `depth` commits, and
+        fetched again doubling the depth until a merge base is found, then
+        unshallowed after `max_depth`.
+        `--depth` is used instead of `--deepen`, only supported since
+        git 2.11.
+        :param remote: String with name or url of remote
+        :param branch: String with name of branch of remote
+        :return: String with sha of merge base or None if it's not found
+        """
+        remote_ref = 'refs/remotes/%s/%s' % (remote, branch)
+        refspec = '+refs/heads/%s:%s' % (branch, remote_ref)
+        if not self.is_shallow():
+            self.fetch(remote, refspec)
+            return self.run(['merge-base', 'HEAD', remote_ref])
+        while True:
+            if not self.fetch(remote, refspec, ['--depth=%d' % depth]):
+                return None
+            merge_base = self.run(['merge-base', 'HEAD', remote_ref])
+            if merge_base or not self.is_shallow():
+                return merge_base
+            if depth >= max_depth:
+                self.fetch(remote, refspec, ['--unshallow'])
+                return self.run(['merge-base', 'HEAD', remote_ref])
+            depth *= 2
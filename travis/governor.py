@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Size the parallel work of the tools from the resources of the machine.
+The number of workers of each kind of work is limited by the CPUs, the
+available memory (of the container if its memory is limited by a cgroup)
+and the free PostgreSQL connections, read once at start,
+and `GOVERNOR_MAX_WORKERS` if it's set. New workers wait while the
+available memory is low, to cut back the concurrency under memory pressure.
+"""
+
+from __future__ import print_function
+
+import multiprocessing
+import os
+import subprocess
+import time
+
+# {kind of work: (CPUs, MB of memory, PostgreSQL connections) by worker}
+WORKER_RESOURCES = {
+    'pylint': (1.0, 300, 0),
+    'db_clone': (0.5, 50, 1),
+    # Network bound
+    'git': (0.25, 30, 0),
+}
+# Files of the CPU quota of the cgroup of the process: (quota, period) in
+# one file or two
+CGROUP_CPU_FILES = [
+    # cgroup v2
+    ('cpu.max',),
+    # cgroup v1
+    ('cpu/cpu.cfs_quota_us', 'cpu/cpu.cfs_period_us'),
+]
+# Memory pressure below this ratio of the total memory
+LOW_MEMORY_RATIO = 0.1
+# Files of the memory of the cgroup of the process:
+# (limit, usage, statistics, field of the page cache that can be freed)
+CGROUP_MEMORY_FILES = [
+    # cgroup v2
+    ('memory.max', 'memory.current', 'memory.stat', 'inactive_file'),
+    # cgroup v1
+    ('memory/memory.limit_in_bytes', 'memory/memory.usage_in_bytes',
+     'memory/memory.stat', 'total_inactive_file'),
+]
+
+
+def get_cpu_count(cgroup_dir='/sys/fs/cgroup'):
+    """CPUs of the machine, limited by the CPU quota of the container"""
+    cpus = multiprocessing.cpu_count()
+    for quota_files in CGROUP_CPU_FILES:
+        try:
+            values = []
+            for quota_file in quota_files:
+                with open(os.path.join(cgroup_dir, quota_file)) as fquota:
+                    values.extend(fquota.read().split())
+            quota, period = values[:2]
+        except (IOError, ValueError):
+            continue
+        # No quota: 'max' in cgroup v2 and -1 in cgroup v1
+        if quota != 'max' and int(quota) > 0:
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+        break
+    return cpus
+
+
+def get_cgroup_memory(cgroup_dir='/sys/fs/cgroup'):
+    """Memory limit of the cgroup and memory used without the page cache
+    that can be freed, like the working set of the container
+    :return: Tuple (limit, usage) in bytes or None if the memory of the
+        cgroup isn't limited
+    """
+    for limit_file, usage_file, stat_file, inactive_field in \
+            CGROUP_MEMORY_FILES:
+        try:
+            with open(os.path.join(cgroup_dir, limit_file)) as flimit:
+                limit = flimit.read().strip()
+            with open(os.path.join(cgroup_dir, usage_file)) as fusage:
+                usage = int(fusage.read())
+        except (IOError, ValueError):
+            continue
+        if limit == 'max' or not limit.isdigit():
+            return None
+        try:
+            with open(os.path.join(cgroup_dir, stat_file)) as fstat:
+                for line in fstat:
+                    items = line.split()
+                    if len(items) == 2 and items[0] == inactive_field:
+                        usage -= min(usage, int(items[1]))
+        except (IOError, ValueError):
+            pass
+        return int(limit), usage
+    return None
+
+
+def get_meminfo(meminfo_path='/proc/meminfo', cgroup_dir='/sys/fs/cgroup'):
+    """Memory of the machine, limited by the memory of the cgroup
+    :return: Dict {field of /proc/meminfo: bytes}
+    """
+    meminfo = {}
+    try:
+        with open(meminfo_path) as fmeminfo:
+            for line in fmeminfo:
+                items = line.split()
+                if len(items) >= 2 and items[1].isdigit():
+                    meminfo[items[0].rstrip(':')] = int(items[1]) * 1024
+    except IOError:
+        pass
+    cgroup_memory = get_cgroup_memory(cgroup_dir)
+    # cgroup v1 shows a limit bigger than the memory of the machine if the
+    # memory isn't limited
+    if cgroup_memory and meminfo.get('MemTotal') and \
+            cgroup_memory[0] < meminfo['MemTotal']:
+        limit, usage = cgroup_memory
+        meminfo['MemTotal'] = limit
+        meminfo['MemAvailable'] = min(
+            meminfo.get('MemAvailable', limit), max(0, limit - usage))
+    return meminfo
+
+
+def get_pg_free_connections():
+    """Connections available for the tools: max_connections without the
+    reserved ones and the ones in use
+    :return: Integer or None if PostgreSQL can't be queried
+    """
+    query = ("SELECT current_setting('max_connections')::int - "
+             "current_setting('superuser_reserved_connections')::int - "
+             "(SELECT count(*) FROM pg_stat_activity)")
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(
+                ['psql', '-d', 'postgres', '-Atc', query], stderr=devnull)
+        return max(0, int(output.strip()))
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+class Governor(object):
+    def __init__(self, cpus=None, meminfo=None, pg_connections=None,
+                 max_workers=None):
+        """
+        :param cpus: Number of CPUs, read from the machine by default
+        :param meminfo: Dict with MemAvailable and MemTotal in bytes,
+            read from /proc/meminfo and the cgroup by default
+        :param pg_connections: Free PostgreSQL connections, queried only by
+            the kinds of work using them
+        :param max_workers: Maximum of workers of any kind
+        """
+        self.cpus = cpus or get_cpu_count()
+        self.meminfo = meminfo if meminfo is not None else get_meminfo()
+        self._pg_connections = pg_connections
+        self.max_workers = max_workers
+
+    @property
+    def pg_connections(self):
+        if self._pg_connections is None:
+            self._pg_connections = get_pg_free_connections()
+        return self._pg_connections
+
+    def get_workers(self, kind, limit=None):
+        """Get the number of workers of a kind of work that the machine
+        can run in parallel
+        :param kind: Key of WORKER_RESOURCES
+        :param limit: Maximum of workers needed
+        :return: Integer, at least 1
+        """
+        cpus, memory, connections = WORKER_RESOURCES[kind]
+        limits = [int(self.cpus / cpus)]
+        if self.meminfo.get('MemAvailable'):
+            limits.append(
+                self.meminfo['MemAvailable'] // (memory * 1024 * 1024))
+        if connections and self.pg_connections is not None:
+            limits.append(self.pg_connections // connections)
+        for max_workers in [limit, self.max_workers]:
+            if max_workers:
+                limits.append(max_workers)
+        return max(1, min(limits))
+
+    def is_memory_low(self):
+        """:return: True if the available memory is below LOW_MEMORY_RATIO
+        of the total memory now"""
+        meminfo = get_meminfo()
+        if not meminfo.get('MemAvailable') or not meminfo.get('MemTotal'):
+            return False
+        return meminfo['MemAvailable'] < \
+            meminfo['MemTotal'] * LOW_MEMORY_RATIO
+
+    def wait_for_memory(self, timeout=60, interval=1, stop=None):
+        """Wait before starting a new worker while the memory is low
+        :param stop: threading.Event to stop waiting when it's set
+        :return: True if the memory is not low
+        """
+        deadline = time.time() + timeout
+        while self.is_memory_low():
+            if time.time() > deadline or stop and stop.is_set():
+                return False
+            if stop:
+                stop.wait(interval)
+            else:
+                time.sleep(interval)
+        return True
+
+
+def get_governor():
+    max_workers = os.environ.get('GOVERNOR_MAX_WORKERS')
+    return Governor(max_workers=int(max_workers) if max_workers else None)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Run `test_flake8` and `test_pylint` checks in one process.
+Each python file of the modules is read and parsed once: the lines are
+used by pycodestyle, and the syntax tree is used by pyflakes and rebuilt
+by astroid for pylint instead of parsing the file again.
+The results and the exit status are the same as `test_flake8` followed by
+`test_pylint`. With flake8 < 3, without the codes of the pyflakes messages,
+`test_flake8` is run.
+"""
+
+from __future__ import print_function
+
+import ast
+import os
+import re
+import runpy
+import subprocess
+import sys
+from ConfigParser import ConfigParser
+from fnmatch import fnmatch
+from lib2to3.pgen2.tokenize import detect_encoding
+
+try:
+    import pycodestyle
+except ImportError:
+    import pep8 as pycodestyle
+import pyflakes.checker
+try:
+    # Codes of pyflakes messages used by flake8
+    from flake8.plugins.pyflakes import FLAKE8_PYFLAKES_CODES
+except ImportError:
+    # flake8 < 3, `test_flake8` is run
+    FLAKE8_PYFLAKES_CODES = None
+
+from getaddons import get_modules
+from travis_helpers import fail_msg, success_msg
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FLAKE8_CONFIGS = [
+    os.path.join(SCRIPT_DIR, 'cfg', 'travis_run_flake8__init__.cfg'),
+    os.path.join(SCRIPT_DIR, 'cfg', 'travis_run_flake8.cfg'),
+]
+NOQA_REGEX = re.compile(
+    r'#\s*noqa(?::[\s]?(?P<codes>([A-Z][0-9]+(?:[,\s]+)?)+))?', re.I)
+NOQA_FILE_REGEX = re.compile(r'#\s*flake8[:=]\s*noqa', re.I)
+
+
+class SourceFile(object):
+    """Python file read and parsed once for all the lint checks"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fsource:
+            self.data = fsource.read()
+        self.lines = self.data.splitlines(True)
+        self.encoding = detect_encoding(iter(self.lines).next)[0]
+        self.syntax_error = None
+        try:
+            # Without the future imports of this module, like print_function
+            self.tree = compile(self.data, path, 'exec', ast.PyCF_ONLY_AST,
+                                dont_inherit=True)
+        except (SyntaxError, TypeError) as error:
+            self.tree = None
+            self.syntax_error = error
+
+
+class SourceCache(object):
+    def __init__(self):
+        # {absolute path: SourceFile}
+        self.files = {}
+        self._ast_from_file = None
+        self._patched = False
+
+    def get(self, path):
+        abs_path = os.path.abspath(path)
+        if abs_path not in self.files:
+            self.files[abs_path] = SourceFile(path)
+        return self.files[abs_path]
+
+    def build_module(self, source, modname):
+        """Build the astroid tree of `source` from its syntax tree"""
+        from astroid import MANAGER
+        from astroid.builder import AstroidBuilder
+        from astroid.rebuilder import TreeRebuilder
+        package = os.path.splitext(
+            os.path.basename(source.path))[0] == '__init__'
+        if modname.endswith('.__init__'):
+            modname = modname[:-len('.__init__')]
+            package = True
+        rebuilder = TreeRebuilder(MANAGER)
+        module = rebuilder.visit_module(
+            source.tree, modname, os.path.abspath(source.path), package)
+        # Nodes processed by _post_build, like AstroidBuilder._data_build
+        module._import_from_nodes = rebuilder._import_from_nodes
+        module._delayed_assattr = rebuilder._delayed_assattr
+        module.file_bytes = source.data
+        return AstroidBuilder(MANAGER)._post_build(module, source.encoding)
+
+    def ast_from_file(self, filepath, modname=None, fallback=True,
+                      source=False):
+        """Wrapper of `AstroidManager.ast_from_file` using the files
+        already parsed"""
+        from astroid import MANAGER
+        parsed = self.files.get(filepath)
+        cached = MANAGER.astroid_cache.get(modname)
+        if parsed is None or parsed.tree is None or not modname or (
+                cached is not None and cached.file == filepath):
+            return self._ast_from_file(filepath, modname, fallback, source)
+        try:
+            return self.build_module(parsed, modname)
+        except Exception:
+            # Tree rebuilder api of this astroid version is not supported
+            return self._ast_from_file(filepath, modname, fallback, source)
+
+    def __enter__(self):
+        from astroid import MANAGER
+        self._patched = 'ast_from_file' in vars(MANAGER)
+        self._ast_from_file = MANAGER.ast_from_file
+        MANAGER.ast_from_file = self.ast_from_file
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        from astroid import MANAGER
+        if self._patched:
+            MANAGER.ast_from_file = self._ast_from_file
+        else:
+            del MANAGER.ast_from_file
+        self._ast_from_file = None
+
+
+class CollectReport(pycodestyle.BaseReport):
+    """pycodestyle report saving the errors of the file checked"""
+
+    def init_file(self, filename, lines, expected, line_offset):
+        super(CollectReport, self).init_file(
+            filename, lines, expected, line_offset)
+        self.file_messages = []
+
+    def error(self, line_number, offset, text, check):
+        code = super(CollectReport, self).error(
+            line_number, offset, text, check)
+        if code:
+            self.file_messages.append(
+                (line_number, offset + 1, code, text[5:]))
+        return code
+
+
+class Flake8Config(object):
+    """Options of a flake8 configuration file used by `test_flake8`"""
+
+    def __init__(self, cfg_path):
+        config = ConfigParser()
+        config.read(cfg_path)
+
+        def get_list(option, default):
+            if not config.has_option('flake8', option):
+                return default
+            return [item.strip()
+                    for item in config.get('flake8', option).split(',')
+                    if item.strip()]
+        self.ignore = get_list('ignore', [])
+        self.exclude = get_list('exclude', [])
+        self.filename = get_list('filename', ['*.py'])
+        self.max_line_length = int(get_list('max-line-length', [79])[0])
+        self.style = pycodestyle.StyleGuide(
+            ignore=self.ignore, max_line_length=self.max_line_length,
+            reporter=CollectReport, quiet=True)
+
+    def is_excluded(self, path):
+        return any(fnmatch(os.path.basename(path), pattern) or
+                   fnmatch(os.path.abspath(path), pattern)
+                   for pattern in self.exclude)
+
+    def is_ignored(self, code):
+        return any(code.startswith(prefix) for prefix in self.ignore)
+
+    def get_files(self, path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(
+                dirname for dirname in dirs
+                if not self.is_excluded(os.path.join(root, dirname)))
+            for fname in sorted(files):
+                fpath = os.path.join(root, fname)
+                if not self.is_excluded(fpath) and any(
+                        fnmatch(fname, pattern)
+                        for pattern in self.filename):
+                    yield fpath
+
+
+def get_pyflakes_code(message):
+    """Get flake8 code of a pyflakes message"""
+    name = type(message).__name__
+    if name not in FLAKE8_PYFLAKES_CODES:
+        raise ValueError("Code of pyflakes message %s unknown" % name)
+    return FLAKE8_PYFLAKES_CODES[name]
+
+
+def check_file(source, config):
+    """Check a file like flake8 with pycodestyle and pyflakes
+    :return: List of tuples (line, column, code, text) sorted by position
+    """
+    if NOQA_FILE_REGEX.search(source.data):
+        return []
+    if source.tree is None:
+        error = source.syntax_error
+        return [(getattr(error, 'lineno', None) or 1,
+                 getattr(error, 'offset', None) or 1,
+                 'E999', '%s: %s' % (type(error).__name__,
+                                     getattr(error, 'msg', error)))]
+    checker = pycodestyle.Checker(source.path, lines=source.lines,
+                                  options=config.style.options)
+    checker.check_all()
+    messages = list(checker.report.file_messages)
+    for message in pyflakes.checker.Checker(source.tree, source.path).messages:
+        code = get_pyflakes_code(message)
+        if not config.is_ignored(code):
+            messages.append((message.lineno, message.col + 1, code,
+                             message.message % message.message_args))
+    res = []
+    for line, col, code, text in sorted(messages):
+        physical_line = source.lines[line - 1] \
+            if 0 < line <= len(source.lines) else ''
+        noqa = NOQA_REGEX.search(physical_line)
+        if noqa and (not noqa.group('codes') or code in re.split(
+                r'[,\s]+', noqa.group('codes').upper())):
+            continue
+        res.append((line, col, code, text))
+    return res
+
+
+def run_flake8(sources, path='.'):
+    """Run the checks of `test_flake8` in the modules of `path`
+    :return: Integer with exit status, 1 if errors were found
+    """
+    if FLAKE8_PYFLAKES_CODES is None:
+        sys.stdout.flush()
+        return subprocess.call([os.path.join(SCRIPT_DIR, 'test_flake8')],
+                               cwd=path)
+    configs = [Flake8Config(cfg_path) for cfg_path in FLAKE8_CONFIGS]
+    count = 0
+    for addon in get_modules(os.path.abspath(path)):
+        for config in configs:
+            for fpath in config.get_files(addon):
+                for line, col, code, text in check_file(
+                        sources.get(fpath), config):
+                    print("%s:%d:%d: %s %s" % (fpath, line, col, code, text))
+                    count += 1
+    return 0 if count == 0 else 1
+
+
+def run_pylint(sources):
+    """Run `test_pylint` in this process, reusing the parsed files
+    :return: Integer with exit status of `test_pylint`
+    """
+    old_argv = sys.argv
+    sys.argv = [os.path.join(SCRIPT_DIR, 'test_pylint')]
+    try:
+        with sources:
+            runpy.run_path(sys.argv[0], run_name='__main__')
+    except SystemExit as exit_exc:
+        return exit_exc.code or 0
+    finally:
+        sys.argv = old_argv
+    return 0
+
+
+def main(argv=None):
+    sources = SourceCache()
+    results = []
+    print("======== Running flake8 ========")
+    results.append(('test_flake8', run_flake8(sources)))
+    print("======== Running pylint ========")
+    results.append(('test_pylint', run_pylint(sources)))
+    print()
+    for name, error in results:
+        print("{0:<28}{1}".format(name, fail_msg if error else success_msg))
+    return 1 if any(error for _, error in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
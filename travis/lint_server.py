@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Resident lint server for the git pre-commit hook.
+The server keeps pylint, its plugins and the astroid trees of the modules
+already parsed in memory, and runs the `flake8` and `test_pylint` requests
+of the hook received by a unix socket of the repository.
+The client runs the command itself if the server is not running.
+
+Usage:
+    lint_server.py start          # Start a server in background
+    lint_server.py serve          # Start a server in foreground
+    lint_server.py stop
+    lint_server.py run flake8 [ARGS]...
+    lint_server.py run test_pylint
+"""
+
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+import runpy
+import socket
+import subprocess
+import sys
+import tempfile
+import traceback
+from StringIO import StringIO
+
+import click
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Environment variables sent by the client to the server
+ENV_PREFIXES = ('TRAVIS_', 'VERSION', 'PYLINT_', 'LINT_')
+
+
+def get_repo_path():
+    """Get the root directory of the git repository of the current
+    directory, or the current directory if it isn't a git repository"""
+    try:
+        with open(os.devnull, 'w') as devnull:
+            repo_path = subprocess.check_output(
+                ['git', 'rev-parse', '--show-toplevel'],
+                stderr=devnull).strip()
+    except (OSError, subprocess.CalledProcessError):
+        repo_path = os.getcwd()
+    return os.path.realpath(repo_path)
+
+
+def get_socket_path(repo_path):
+    """Get the unix socket path of the server of `repo_path`
+    A temporary directory is used for paths too long for a unix socket.
+    """
+    socket_path = os.path.join(repo_path, '.git', 'mqt_lint_server.sock')
+    if len(socket_path) > 100 or \
+            not os.path.isdir(os.path.join(repo_path, '.git')):
+        socket_path = os.path.join(
+            tempfile.gettempdir(), 'mqt_lint_%s.sock' %
+            hashlib.sha1(repo_path).hexdigest()[:12])
+    return socket_path
+
+
+def encode_request(value):
+    """Encode the unicode strings of a request decoded from json to `str`,
+    like the values of os.environ, sys.argv and the paths in python 2"""
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, dict):
+        return dict((encode_request(key), encode_request(item))
+                    for key, item in value.items())
+    if isinstance(value, list):
+        return [encode_request(item) for item in value]
+    return value
+
+
+def get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def get_command(name, args):
+    """Get the command to run a request without server"""
+    if name == 'test_pylint':
+        return [os.path.join(SCRIPT_DIR, 'test_pylint')] + list(args)
+    return [name] + list(args)
+
+
+def send_request(socket_path, request):
+    """Send a request to the server
+    :return: Dict with response or None if the server is not running
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except socket.error:
+        return None
+    try:
+        client.sendall(json.dumps(request) + '\n')
+        data = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data.append(chunk)
+    finally:
+        client.close()
+    if not data:
+        return None
+    return json.loads(''.join(data))
+
+
+class LintServer(object):
+    def __init__(self, repo_path, socket_path, idle_timeout=3600):
+        """
+        :param repo_path: Root directory of the git repository
+        :param socket_path: Path of unix socket to listen
+        :param idle_timeout: Seconds without requests to stop the server
+        """
+        self.repo_path = repo_path
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        # {file path: modification time} of the astroid trees kept in cache
+        # after the last run
+        self.mtimes = {}
+
+    def is_repo_module(self, module):
+        path = getattr(module, 'file', None)
+        return path and os.path.realpath(path).startswith(
+            self.repo_path + os.sep)
+
+    def save_mtimes(self):
+        from astroid import MANAGER
+        self.mtimes = dict(
+            (module.file, get_mtime(module.file))
+            for module in MANAGER.astroid_cache.values()
+            if getattr(module, 'file', None) and
+            not self.is_repo_module(module))
+
+    def invalidate_cache(self):
+        """Remove from astroid cache the modules of the repository, they are
+        checked by pylint, and all the modules if the file of a module kept
+        changed: the inference results saved in the other trees could point
+        to its old tree"""
+        try:
+            from astroid import MANAGER
+        except ImportError:
+            return
+        if any(get_mtime(path) != mtime
+               for path, mtime in self.mtimes.items()):
+            MANAGER.clear_cache()
+        for modname, module in list(MANAGER.astroid_cache.items()):
+            if self.is_repo_module(module):
+                del MANAGER.astroid_cache[modname]
+        # Modules of the repository can be added or removed
+        MANAGER._mod_file_cache.clear()
+
+    def run_flake8(self, args):
+        try:
+            from flake8.main import cli
+        except ImportError:
+            # Old flake8 versions don't have an api to run them like
+            # the command line
+            process = subprocess.Popen(
+                get_command('flake8', args),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, stderr = process.communicate()
+            sys.stdout.write(stdout)
+            sys.stderr.write(stderr)
+            return process.returncode
+        cli.main(list(args))
+        return 0
+
+    def run_test_pylint(self, args):
+        self.invalidate_cache()
+        sys.argv = get_command('test_pylint', args)
+        try:
+            runpy.run_path(sys.argv[0], run_name='__main__')
+        finally:
+            self.save_mtimes()
+        return 0
+
+    def handle(self, request):
+        """Run a request like a command line in the directory and
+        environment of the client
+        :return: Dict with stdout, stderr and returncode of the request
+        """
+        old_state = (os.getcwd(), os.environ.copy(), sys.path[:], sys.argv,
+                     sys.stdout, sys.stderr)
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+        request = encode_request(request)
+        try:
+            os.chdir(request['cwd'])
+            for key in list(os.environ):
+                if key.startswith(ENV_PREFIXES):
+                    del os.environ[key]
+            os.environ.update(request['env'])
+            if request['name'] == 'flake8':
+                returncode = self.run_flake8(request['args'])
+            elif request['name'] == 'test_pylint':
+                returncode = self.run_test_pylint(request['args'])
+            else:
+                raise ValueError("Unknown request %s" % request['name'])
+        except SystemExit as exit_exc:
+            returncode = exit_exc.code
+            if returncode is None:
+                returncode = 0
+            elif not isinstance(returncode, int):
+                print(returncode, file=sys.stderr)
+                returncode = 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            stdout, stderr = sys.stdout.getvalue(), sys.stderr.getvalue()
+            cwd, environ, sys_path, sys.argv, sys.stdout, sys.stderr = \
+                old_state
+            # run_pylint appends the --sys-paths to sys.path
+            sys.path[:] = sys_path
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+        return {'stdout': stdout, 'stderr': stderr, 'returncode': returncode}
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(5)
+        server.settimeout(self.idle_timeout)
+        print("Lint server of %s listening in %s" % (
+            self.repo_path, self.socket_path))
+        try:
+            while True:
+                try:
+                    connection = server.accept()[0]
+                except socket.timeout:
+                    break
+                connection.settimeout(None)
+                try:
+                    data = connection.makefile().readline()
+                    request = json.loads(data)
+                    if request['name'] == 'stop':
+                        break
+                    connection.sendall(json.dumps(self.handle(request)))
+                finally:
+                    connection.close()
+        finally:
+            server.close()
+            os.remove(self.socket_path)
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.option('--idle-timeout', default=3600,
+              help="Seconds without requests to stop the server")
+def serve(idle_timeout):
+    """Start a server of the current repository in foreground"""
+    repo_path = get_repo_path()
+    LintServer(repo_path, get_socket_path(repo_path), idle_timeout).serve()
+
+
+@main.command()
+@click.option('--idle-timeout', default=3600,
+              help="Seconds without requests to stop the server")
+def start(idle_timeout):
+    """Start a server of the current repository in background"""
+    repo_path = get_repo_path()
+    log_path = get_socket_path(repo_path)[:-len('.sock')] + '.log'
+    with open(log_path, 'a') as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'serve',
+             '--idle-timeout', str(idle_timeout)],
+            stdout=log, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+    print("Lint server started, log file: %s" % log_path)
+
+
+@main.command()
+def stop():
+    """Stop the server of the current repository"""
+    send_request(get_socket_path(get_repo_path()), {'name': 'stop'})
+
+
+@main.command(context_settings=dict(ignore_unknown_options=True))
+@click.argument('name', type=click.Choice(['flake8', 'test_pylint']))
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+def run(name, args):
+    """Run `flake8` or `test_pylint` in the server if it's running"""
+    request = {
+        'name': name,
+        'args': args,
+        'cwd': os.getcwd(),
+        'env': dict((key, value) for key, value in os.environ.items()
+                    if key.startswith(ENV_PREFIXES)),
+    }
+    response = send_request(get_socket_path(get_repo_path()), request)
+    if response is None:
+        sys.exit(subprocess.call(get_command(name, args)))
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.exit(response['returncode'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Wall time of pylint by file and by checker.
+The time of a file includes its parsing and all the checks of the file.
+The time of a checker is the time of its `visit_*`, `leave_*`,
+`process_*`, `open` and `close` methods in all the files.
+Only the files checked in the main process are measured (`--jobs=1`).
+"""
+
+from __future__ import print_function
+
+import functools
+import json
+import os
+import time
+
+from pylint.lint import PyLinter
+
+import travis_helpers
+
+CHECKER_METHOD_PREFIXES = ('visit_', 'leave_', 'process_')
+CHECKER_METHODS = ('open', 'close')
+
+
+class LintTimer(object):
+    def __init__(self):
+        # {file path: seconds}
+        self.files = {}
+        # {checker name: seconds}
+        self.checkers = {}
+        self._methods = {}
+
+    def add(self, times, key, start):
+        times[key] = times.get(key, 0.0) + time.time() - start
+
+    def timed(self, times, key, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(times, key, start)
+        return wrapper
+
+    def wrap_checker(self, checker):
+        """Replace the methods of `checker` called by pylint by wrappers
+        measuring their time. `functools.wraps` keeps the messages of the
+        methods used to skip them when their messages are disabled."""
+        if getattr(checker, '_lint_timer', None) is self:
+            return
+        checker._lint_timer = self
+        for name in dir(checker):
+            if not name.startswith(CHECKER_METHOD_PREFIXES) and \
+                    name not in CHECKER_METHODS:
+                continue
+            method = getattr(checker, name)
+            if callable(method):
+                setattr(checker, name,
+                        self.timed(self.checkers, checker.name, method))
+
+    def __enter__(self):
+        timer = self
+        self._methods = dict(
+            (name, vars(PyLinter)[name])
+            for name in ['get_ast', 'check_astroid_module',
+                         'prepare_checkers'])
+        get_ast = self._methods['get_ast']
+        check_astroid_module = self._methods['check_astroid_module']
+        prepare_checkers = self._methods['prepare_checkers']
+
+        def timed_get_ast(self, filepath, *args, **kwargs):
+            start = time.time()
+            try:
+                return get_ast(self, filepath, *args, **kwargs)
+            finally:
+                timer.add(timer.files, filepath, start)
+
+        def timed_check_astroid_module(self, ast_node, *args, **kwargs):
+            start = time.time()
+            try:
+                return check_astroid_module(self, ast_node, *args, **kwargs)
+            finally:
+                timer.add(timer.files, ast_node.file, start)
+
+        def timed_prepare_checkers(self, *args, **kwargs):
+            checkers = prepare_checkers(self, *args, **kwargs)
+            for checker in checkers:
+                timer.wrap_checker(checker)
+            return checkers
+
+        PyLinter.get_ast = timed_get_ast
+        PyLinter.check_astroid_module = timed_check_astroid_module
+        PyLinter.prepare_checkers = timed_prepare_checkers
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for name, method in self._methods.items():
+            setattr(PyLinter, name, method)
+        self._methods = {}
+
+    def print_top(self, top=10):
+        for title, times in [('files', self.files),
+                             ('checkers', self.checkers)]:
+            print(travis_helpers.yellow("Slowest pylint %s:" % title))
+            for key, seconds in sorted(times.items(), key=lambda item:
+                                       item[1], reverse=True)[:top]:
+                print("%8.2fs  %s" % (seconds, key))
+
+    def get_over_budget(self, budget):
+        """Get the files checked in more than `budget` seconds
+        :return: List of tuples (file path, seconds)
+        """
+        return sorted([(fpath, seconds)
+                       for fpath, seconds in self.files.items()
+                       if seconds > budget],
+                      key=lambda item: item[1], reverse=True)
+
+    def save(self, fname):
+        """Save the times in json file `fname`, adding the times
+        saved by previous runs of the build in the same file"""
+        times = {'files': {}, 'checkers': {}}
+        if os.path.isfile(fname):
+            with open(fname) as ftimes:
+                times.update(json.load(ftimes))
+        for key, new_times in [('files', self.files),
+                               ('checkers', self.checkers)]:
+            for name, seconds in new_times.items():
+                times[key][name] = times[key].get(name, 0.0) + seconds
+        with open(fname, 'w') as ftimes:
+            json.dump(times, ftimes, indent=4, sort_keys=True)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Count the pylint errors of several odoo versions with a single pylint run.
+The versions differ only by the overlay `travis_run_pylint_exclude_<version>`
+that disables messages and narrows some options, so the messages of a
+version are the messages of the run without overlay that the overlay
+doesn't remove.
+Overlays whose effect can't be derived from the messages (e.g. enabling
+messages or widening options of messages enabled) need a real run of
+pylint with the overlay.
+"""
+
+import os
+import re
+import ConfigParser
+
+from pylint.lint import PyLinter
+
+# {option: (message filtered by the option, regex of the value in message)}
+OPTION_FILTERS = {
+    'deprecated-modules': (
+        'deprecated-module', re.compile(r"deprecated module ['\"]([^'\"]+)")),
+    'manifest_deprecated_keys': (
+        'manifest-deprecated-key', re.compile(r'key "([^"]+)"')),
+}
+
+
+def get_overlay(odoo_version):
+    """Get the options of the overlay configuration file of a version
+    :param odoo_version: String with name of version of odoo
+    :return: List of tuples (option, value)
+    """
+    odoo_version = odoo_version.replace('.', '')
+    version_cfg = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        'cfg/travis_run_pylint_exclude_{odoo_version}.cfg'.format(
+            odoo_version=odoo_version))
+    options = []
+    if os.path.isfile(version_cfg):
+        config = ConfigParser.ConfigParser()
+        config.readfp(open(version_cfg))
+        for section in config.sections():
+            options.extend(config.items(section))
+    return options
+
+
+def split_values(value):
+    return set(item.strip() for item in value.split(',') if item.strip())
+
+
+class MessageCollector(object):
+    """Save the messages reported by the pylint runs"""
+
+    def __init__(self):
+        # List of tuples (linter, list of messages) of each run
+        self.runs = []
+        self._set_reporter = None
+
+    def get_messages(self, linter):
+        for run_linter, messages in self.runs:
+            if run_linter is linter:
+                return messages
+        self.runs.append((linter, []))
+        return self.runs[-1][1]
+
+    def __enter__(self):
+        collector = self
+        self._set_reporter = set_reporter = vars(PyLinter)['set_reporter']
+
+        def collecting_set_reporter(linter, reporter):
+            set_reporter(linter, reporter)
+            messages = collector.get_messages(linter)
+            handle_message = reporter.handle_message
+
+            def collect(msg):
+                messages.append(msg)
+                return handle_message(msg)
+            reporter.handle_message = collect
+
+        PyLinter.set_reporter = collecting_set_reporter
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        PyLinter.set_reporter = self._set_reporter
+
+
+def get_option_value(linter, option):
+    """Get the value of an option of pylint or of a checker
+    :return: Set of values or None if the option is unknown
+    """
+    for checker in [linter] + linter.get_checkers():
+        for name, _ in getattr(checker, 'options', ()):
+            if name.replace('_', '-') == option.replace('_', '-'):
+                value = getattr(checker.config, name.replace('-', '_'))
+                if isinstance(value, basestring):
+                    return split_values(value)
+                return set(value or [])
+    return None
+
+
+def get_message_filter(linter, overlay):
+    """Get a function returning if a message of a run of `linter` without
+    overlay is also reported with `overlay`
+    :return: Function or None if the messages with overlay can't be derived
+    """
+    disabled = set()
+    narrowed = {}
+    for option, value in overlay:
+        if option != 'disable':
+            continue
+        for msg in split_values(value):
+            try:
+                msg_def = linter.msgs_store.check_message_id(msg)
+            except Exception:
+                # Checker name or category
+                return None
+            disabled.update([msg_def.msgid, msg_def.symbol])
+    for option, value in overlay:
+        if option == 'disable':
+            continue
+        if option in OPTION_FILTERS:
+            symbol = OPTION_FILTERS[option][0]
+            if symbol in disabled or \
+                    not linter.is_message_enabled(symbol):
+                # The option only changes a message not reported
+                continue
+        base_value = get_option_value(linter, option)
+        value = split_values(value)
+        if value == base_value:
+            continue
+        if base_value is None or option not in OPTION_FILTERS or \
+                value - base_value:
+            # The overlay changes the checks in a way that can't be
+            # derived from the messages
+            return None
+        narrowed[OPTION_FILTERS[option][0]] = (
+            OPTION_FILTERS[option][1], value)
+
+    def is_reported(msg):
+        if msg.msg_id in disabled or msg.symbol in disabled:
+            return False
+        if msg.symbol in narrowed:
+            regex, values = narrowed[msg.symbol]
+            match = regex.search(msg.msg)
+            if not match:
+                raise ValueError(msg.msg)
+            return match.group(1) in values
+        return True
+    return is_reported
+
+
+def get_count_errors(collector, overlay, msgs_no_count=None):
+    """Get the errors of the runs saved by `collector` with an overlay
+    :return: Integer with count of errors or None if pylint must run again
+        with the overlay
+    """
+    msgs_no_count = msgs_no_count or []
+    count = 0
+    for linter, messages in collector.runs:
+        is_reported = get_message_filter(linter, overlay)
+        if is_reported is None:
+            return None
+        try:
+            count += len([msg for msg in messages
+                          if msg.symbol not in msgs_no_count and
+                          is_reported(msg)])
+        except ValueError:
+            # Value of the option not found in the message
+            return None
+    return count
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers to read odoo server logs and get statistics of the test runs.
+"""
+
+from __future__ import print_function
+
+import ConfigParser
+import datetime
+import json
+import os
+import re
+
+# ASCII color escapes: http://serverfault.com/questions/71285
+COLOR_REGEX = re.compile(r'\x1B\[([0-9]{1,2}(;[0-9]{1,2})?)?[m|K]')
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+
+# Markers of log messages used to compute durations:
+# - "module sale: creating or updating database tables"
+# - "module sale: loading test/sale_order.yml"
+# - "openerp.addons.sale.tests.test_sale running tests."
+# - "test_confirm (openerp.addons.sale.tests.test_sale.TestSale)"
+# - "Ran 3 tests in 1.234s"
+MODULE_REGEX = re.compile(r'^module (?P<module>\w+): ')
+YAML_REGEX = re.compile(
+    r'^module (?P<module>\w+): loading (?P<yaml>\S+\.yml)$')
+TEST_MODULE_REGEX = re.compile(
+    r'^(?:openerp|odoo)\.addons\.(?P<module>\w+)\.[\w.]+ running tests\.$')
+TEST_REGEX = re.compile(
+    r'^(?P<test>test\w*) '
+    r'\((?P<class>(?:openerp|odoo)\.addons\.(?P<module>\w+)\.[\w.]+)\)')
+TESTS_RAN_REGEX = re.compile(r'^Ran \d+ tests? in ')
+
+DURATION_CATEGORIES = ['module', 'yaml', 'class', 'test']
+SQL_LOGGERS = ('openerp.sql_db', 'odoo.sql_db')
+
+
+def get_log_start_regex(dbname):
+    """Get regex of first line of a log record of the database `dbname`"""
+    return re.compile(
+        r'^(?P<date>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) \d+ '
+        r'(?P<loglevel>\w+) (?P<db>(%s)|([?])) (?P<logger>\S+): '
+        r'(?P<message>.*)$' % dbname)
+
+
+def parse_log_records(fname, dbname):
+    """Read a log file removing ASCII color escapes
+    :param fname: String with path of log file
+    :param dbname: Name of database to get log records
+    :return: List of dict with keys date, loglevel, db, logger and message
+    """
+    log_start_regex = get_log_start_regex(dbname)
+    log_records = []
+    last_log_record = dict.fromkeys(log_start_regex.groupindex.keys())
+    with open(fname) as log:
+        for line in log:
+            line = COLOR_REGEX.sub('', line)
+            match = log_start_regex.match(line)
+            if match:
+                last_log_record = match.groupdict()
+                log_records.append(last_log_record)
+            else:
+                last_log_record['message'] = '%s\n%s' % (
+                    last_log_record['message'], line.rstrip('\n')
+                )
+    return log_records
+
+
+def get_durations(log_records):
+    """Compute durations from the time between marker log records.
+    The span of a module, yaml file, test class or test method starts
+    with its marker and finishes with the next marker of the same or
+    a higher level.
+    :param log_records: List of log records from `parse_log_records`
+    :return: Dict {category: {name: seconds}} with categories:
+        module, yaml, class and test.
+    """
+    durations = dict((category, {}) for category in DURATION_CATEGORIES)
+    spans = {}
+
+    def close(categories, now):
+        for category in categories:
+            if category not in spans:
+                continue
+            name, start = spans.pop(category)
+            seconds = (now - start).total_seconds()
+            durations[category][name] = \
+                durations[category].get(name, 0.0) + seconds
+
+    now = None
+    for record in log_records:
+        if not record.get('date'):
+            continue
+        now = datetime.datetime.strptime(record['date'], DATE_FORMAT)
+        message = record['message'].split('\n')[0]
+        match = TEST_REGEX.match(message)
+        if match:
+            close(['test'], now)
+            if spans.get('class', (None,))[0] != match.group('class'):
+                close(['class'], now)
+                spans['class'] = (match.group('class'), now)
+            spans['test'] = (
+                '%s.%s' % (match.group('class'), match.group('test')), now)
+            continue
+        if TESTS_RAN_REGEX.match(message):
+            close(['test', 'class'], now)
+            continue
+        match = TEST_MODULE_REGEX.match(message)
+        if match:
+            close(['test', 'class', 'yaml'], now)
+            continue
+        match = MODULE_REGEX.match(message)
+        if match:
+            if spans.get('module', (None,))[0] != match.group('module'):
+                close(DURATION_CATEGORIES, now)
+                spans['module'] = (match.group('module'), now)
+            close(['test', 'class', 'yaml'], now)
+            match = YAML_REGEX.match(message)
+            if match:
+                spans['yaml'] = (
+                    '%s/%s' % (match.group('module'), match.group('yaml')),
+                    now)
+            continue
+        if message == 'Modules loaded.':
+            close(DURATION_CATEGORIES, now)
+    if now is not None:
+        close(DURATION_CATEGORIES, now)
+    return durations
+
+
+def merge_durations(total, durations):
+    """Add `durations` (or query counts) to `total` in place
+    :return: Dict `total`
+    """
+    for category, items in durations.items():
+        total_items = total.setdefault(category, {})
+        for name, seconds in items.items():
+            total_items[name] = total_items.get(name, 0.0) + seconds
+    return total
+
+
+def print_slowest(durations, top=10):
+    """Print the `top` slowest items of each category"""
+    for category in DURATION_CATEGORIES:
+        items = sorted(durations.get(category, {}).items(),
+                       key=lambda item: (-item[1], item[0]))[:top]
+        if not items:
+            continue
+        print("Slowest %d %s:" % (len(items), category))
+        for name, seconds in items:
+            print("%10.3fs %s" % (seconds, name))
+
+
+def load_baseline(fname):
+    """Load a baseline file of durations
+    :param fname: String with path of json file with the format
+        {category: {name: seconds or [seconds of each build]}}
+    :return: Dict {category: {name: [seconds of each build]}}
+    """
+    if not os.path.isfile(fname):
+        return {}
+    with open(fname) as fbaseline:
+        baseline = json.load(fbaseline)
+    for items in baseline.values():
+        for name, history in items.items():
+            if not isinstance(history, list):
+                items[name] = [history]
+    return baseline
+
+
+def save_baseline(fname, baseline, durations, history=5):
+    """Add `durations` to the `history` last durations of `baseline`
+    and save it in `fname`"""
+    for category, items in durations.items():
+        baseline_items = baseline.setdefault(category, {})
+        for name, seconds in items.items():
+            baseline_items[name] = (
+                baseline_items.get(name, []) + [round(seconds, 3)]
+            )[-history:]
+    with open(fname, 'w') as fbaseline:
+        json.dump(baseline, fbaseline, indent=4, sort_keys=True)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def get_regressions(durations, baseline, tolerance=0.5, min_delta=1.0,
+                    categories=None):
+    """Compare durations with the median of durations of the baseline
+    :param tolerance: Ratio of the baseline that a duration can exceed
+    :param min_delta: Seconds of difference ignored as noise
+    :param categories: List of categories to compare. Default: module
+    :return: List of tuples (category, name, seconds, baseline seconds)
+    """
+    if categories is None:
+        categories = ['module']
+    regressions = []
+    for category in categories:
+        baseline_items = baseline.get(category, {})
+        for name, seconds in sorted(durations.get(category, {}).items()):
+            if not baseline_items.get(name):
+                continue
+            expected = median(baseline_items[name])
+            if seconds > expected * (1 + tolerance) and \
+                    seconds - expected > min_delta:
+                regressions.append((category, name, seconds, expected))
+    return regressions
+
+
+class QueryCounter(object):
+    """Count the queries logged by the `sql_db` logger in debug level
+    by module and by test method, without storing them.
+    """
+    def __init__(self):
+        self.log_start_regex = get_log_start_regex(r'\S+')
+        self.counts = {'module': {}, 'test': {}}
+        self.module = None
+        self.test = None
+        self._in_sql_record = False
+
+    def _count(self, category, name):
+        if name:
+            self.counts[category][name] = \
+                self.counts[category].get(name, 0) + 1
+
+    def feed(self, line):
+        """Process a line of the server output
+        :return: True if the line is part of a sql_db debug record,
+            to discard it.
+        """
+        match = self.log_start_regex.match(COLOR_REGEX.sub('', line))
+        if not match:
+            # Next lines of a multi-line record
+            return self._in_sql_record
+        record = match.groupdict()
+        self._in_sql_record = record['logger'] in SQL_LOGGERS and \
+            record['loglevel'] == 'DEBUG'
+        if self._in_sql_record:
+            if record['message'].startswith('query:'):
+                self._count('module', self.module)
+                self._count('test', self.test)
+            return True
+        message = record['message']
+        match = TEST_REGEX.match(message)
+        if match:
+            self.module = match.group('module')
+            self.test = '%s.%s' % (match.group('class'), match.group('test'))
+        elif TESTS_RAN_REGEX.match(message):
+            self.test = None
+        else:
+            match = MODULE_REGEX.match(message) or \
+                TEST_MODULE_REGEX.match(message)
+            if match:
+                self.module = match.group('module')
+                self.test = None
+        return False
+
+
+def get_query_budgets(fname):
+    """Get the query budgets from a configuration file with the format:
+
+        [module]
+        sale = 5000
+
+        [test]
+        openerp.addons.sale.tests.test_sale.TestSale.test_confirm = 300
+
+    :return: Dict {category: {name: maximum of queries}}
+    """
+    config = ConfigParser.ConfigParser()
+    # Keep case of option names
+    config.optionxform = str
+    with open(fname) as fconfig:
+        config.readfp(fconfig)
+    return dict(
+        (section, dict((name, int(value))
+                       for name, value in config.items(section)))
+        for section in config.sections())
+
+
+def get_over_budget(counts, budgets):
+    """:return: List of tuples (category, name, queries, budget)"""
+    return [
+        (category, name, counts.get(category, {}).get(name, 0), budget)
+        for category, items in sorted(budgets.items())
+        for name, budget in sorted(items.items())
+        if counts.get(category, {}).get(name, 0) > budget
+    ]
+
+
+def print_query_counts(counts, top=10):
+    """Print the `top` tests and modules with more queries"""
+    for category in ['module', 'test']:
+        items = sorted(counts.get(category, {}).items(),
+                       key=lambda item: (-item[1], item[0]))[:top]
+        if not items:
+            continue
+        print("Heaviest %d %s by SQL queries:" % (len(items), category))
+        for name, queries in items:
+            print("%10d %s" % (queries, name))
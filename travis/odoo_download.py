@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Download and extract an archive of the odoo server with a local cache.
+
+Usage: odoo_download.py URL TARGET
+
+The archive and its extracted tree are saved in the cache directory
+`ODOO_CACHE_DIR` (default `~/.cache/odoo_archives`). The next runs check
+if the archive changed before downloading it again:
+- For github archives, the commit of the branch with `git ls-remote`
+- Otherwise, the `ETag` and `Last-Modified` headers of the response
+If it didn't change, the download and the extraction are skipped.
+TARGET is a symbolic link to the extracted tree, replaced atomically.
+`file://` URLs are supported to use local archives.
+"""
+
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import urllib2
+
+GITHUB_ARCHIVE_REGEX = re.compile(
+    r'^https://github\.com/(?P<repo>[^/]+/[^/]+)/archive/'
+    r'(?P<ref>.+)\.tar\.gz$')
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_remote_commit(url):
+    """Get the commit of the ref of a github archive url
+    :return: String with commit sha or None if it can't be resolved
+    """
+    match = GITHUB_ARCHIVE_REGEX.match(url)
+    if not match:
+        return None
+    repo_url = 'https://github.com/%s.git' % match.group('repo')
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(
+                ['git', 'ls-remote', repo_url, match.group('ref')],
+                stderr=devnull)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    # The branch has priority over a tag with the same name
+    refs = dict(line.split('\t')[::-1] for line in output.splitlines()
+                if '\t' in line)
+    for ref in ['refs/heads/', 'refs/tags/']:
+        commit = refs.get(ref + match.group('ref'))
+        if commit:
+            return commit
+    return None
+
+
+class ArchiveCache(object):
+    def __init__(self, cache_dir, url):
+        """
+        :param cache_dir: Directory of the cache of all the archives
+        :param url: Url of the archive
+        """
+        self.url = url
+        self.entry_dir = os.path.join(
+            os.path.expanduser(cache_dir), hashlib.sha1(url).hexdigest())
+        self.archive_path = os.path.join(self.entry_dir, 'archive.tar.gz')
+        self.meta_path = os.path.join(self.entry_dir, 'meta.json')
+        self.meta = {}
+        if os.path.isfile(self.meta_path):
+            with open(self.meta_path) as fmeta:
+                self.meta = json.load(fmeta)
+
+    def save_meta(self):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as fmeta:
+            json.dump(self.meta, fmeta, indent=4)
+        os.rename(tmp_path, self.meta_path)
+
+    def get_tree(self):
+        """:return: Path of extracted tree of the archive if it exists"""
+        tree = self.meta.get('tree')
+        if tree and os.path.isdir(tree):
+            return tree
+        return None
+
+    def download(self):
+        """Download the archive if it changed since the last download
+        :return: True if a new archive was downloaded
+        """
+        request = urllib2.Request(self.url)
+        if os.path.isfile(self.archive_path):
+            if self.meta.get('etag'):
+                request.add_header('If-None-Match', self.meta['etag'])
+            if self.meta.get('last_modified'):
+                request.add_header('If-Modified-Since',
+                                   self.meta['last_modified'])
+        try:
+            response = urllib2.urlopen(request)
+        except urllib2.HTTPError as error:
+            if error.code == 304:
+                return False
+            raise
+        try:
+            etag = response.info().getheader('ETag')
+            last_modified = response.info().getheader('Last-Modified')
+            # Servers without conditional requests (e.g. file urls)
+            if os.path.isfile(self.archive_path) and \
+                    (etag or last_modified) and \
+                    etag == self.meta.get('etag') and \
+                    last_modified == self.meta.get('last_modified'):
+                return False
+            if not os.path.isdir(self.entry_dir):
+                os.makedirs(self.entry_dir)
+            tmp_path = '%s.%d.tmp' % (self.archive_path, os.getpid())
+            with open(tmp_path, 'wb') as farchive:
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    farchive.write(chunk)
+            os.rename(tmp_path, self.archive_path)
+        finally:
+            response.close()
+        self.meta.update(etag=etag, last_modified=last_modified)
+        return True
+
+    def extract(self):
+        """Extract the archive in a new directory of the cache
+        :return: Path of the top directory of the archive
+        """
+        tmp_dir = tempfile.mkdtemp(prefix='tree-', dir=self.entry_dir)
+        with tarfile.open(self.archive_path) as archive:
+            archive.extractall(tmp_dir)
+        items = os.listdir(tmp_dir)
+        if len(items) == 1 and os.path.isdir(os.path.join(tmp_dir, items[0])):
+            return os.path.join(tmp_dir, items[0])
+        return tmp_dir
+
+    def remove_old_trees(self):
+        tree = self.get_tree()
+        for item in os.listdir(self.entry_dir):
+            path = os.path.join(self.entry_dir, item)
+            if item.startswith('tree-') and os.path.isdir(path) and \
+                    not (tree and tree.startswith(path + os.sep)):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def update(self):
+        """Get the extracted tree of the last archive
+        :return: Path of the tree
+        """
+        tree = self.get_tree()
+        commit = get_remote_commit(self.url)
+        if tree and commit and commit == self.meta.get('commit'):
+            print("Odoo archive %s not changed (commit %s)" % (
+                self.url, commit))
+            return tree
+        downloaded = self.download()
+        if tree and not downloaded:
+            print("Odoo archive %s not modified" % self.url)
+        else:
+            print("Extracting odoo archive %s" % self.url)
+            self.meta['tree'] = tree = self.extract()
+        self.meta['commit'] = commit
+        self.save_meta()
+        self.remove_old_trees()
+        return tree
+
+
+def switch_symlink(tree, target):
+    """Make `target` a symbolic link to `tree`, replacing it atomically"""
+    target = os.path.abspath(os.path.expanduser(target))
+    if os.path.isdir(target) and not os.path.islink(target):
+        # Tree extracted without cache
+        shutil.rmtree(target)
+    if not os.path.isdir(os.path.dirname(target)):
+        os.makedirs(os.path.dirname(target))
+    tmp_link = '%s.%d.tmp' % (target, os.getpid())
+    os.symlink(tree, tmp_link)
+    os.rename(tmp_link, target)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    if len(argv) != 3:
+        print(__doc__)
+        return 1
+    url, target = argv[1:]
+    cache_dir = os.environ.get('ODOO_CACHE_DIR', '~/.cache/odoo_archives')
+    tree = ArchiveCache(cache_dir, url).update()
+    switch_symlink(tree, target)
+    print("Odoo server in %s" % target)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Generate lightweight stubs of the odoo server package for pylint.
+
+The stubs keep the imports, the assignments, and the classes and functions
+with their signatures, but the bodies of the functions are replaced by
+their `return` statements. pylint infers the odoo api (models, fields, api,
+tools, exceptions...) against these small modules instead of the full
+server, and the odoo source code is not needed to lint once the stubs are
+generated.
+
+Usage: odoo_stubs.py SERVER_PATH STUBS_DIR
+"""
+
+from __future__ import print_function
+
+import ast
+import bisect
+import os
+import sys
+import tokenize
+from StringIO import StringIO
+
+import click
+
+# Statements copied as is in the stubs
+COPY_NODES = (ast.Import, ast.ImportFrom, ast.Assign, ast.AugAssign)
+NESTED_BODIES = ('body', 'orelse', 'finalbody', 'handlers')
+
+
+def reindent(lines, indent):
+    """Replace the indentation of the first line of `lines` by `indent`
+    in all the lines"""
+    old_indent = len(lines[0]) - len(lines[0].lstrip())
+    return [indent + (line[old_indent:] if not line[:old_indent].strip()
+                      else line.lstrip())
+            for line in lines]
+
+
+def get_nested(node):
+    """Get the statements nested in a compound statement"""
+    children = []
+    for field in NESTED_BODIES:
+        value = getattr(node, field, None)
+        # `exec` statement has an expression in `body`
+        if isinstance(value, list):
+            for item in value:
+                children.extend(item.body if isinstance(
+                    item, ast.excepthandler) else [item])
+    return children
+
+
+class StubGenerator(object):
+    def __init__(self, source):
+        self.lines = source.splitlines()
+        self.tree = ast.parse(source)
+        self.tokens = list(tokenize.generate_tokens(
+            StringIO(source).readline))
+        self.token_rows = [token[2][0] for token in self.tokens]
+        # {first line: last line} of logical lines
+        self.logical_lines = {}
+        line_start = None
+        for tok_type, _, tok_start, tok_end, _ in self.tokens:
+            if tok_type in (tokenize.NL, tokenize.COMMENT, tokenize.INDENT,
+                            tokenize.DEDENT):
+                continue
+            if line_start is None:
+                line_start = tok_start[0]
+            if tok_type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                self.logical_lines[line_start] = tok_end[0]
+                line_start = None
+
+    def get_start(self, node):
+        decorators = getattr(node, 'decorator_list', [])
+        return min([node.lineno] + [item.lineno for item in decorators])
+
+    def get_end(self, node):
+        """Get the last line of a statement"""
+        children = get_nested(node)
+        if children:
+            return max(self.get_end(child) for child in children)
+        return self.logical_lines.get(node.lineno, node.lineno)
+
+    def get_source(self, node, indent):
+        """Get source of `node` with the indentation `indent`"""
+        return reindent(
+            self.lines[self.get_start(node) - 1:self.get_end(node)], indent)
+
+    def get_header(self, node, indent):
+        """Get the lines of `def` or `class` statement with decorators
+        until the colon starting its body"""
+        depth = 0
+        first = bisect.bisect_left(self.token_rows, self.get_start(node))
+        for tok_type, tok_string, tok_start, _, _ in self.tokens[first:]:
+            if tok_type != tokenize.OP:
+                continue
+            if tok_string in ('(', '[', '{'):
+                depth += 1
+            elif tok_string in (')', ']', '}'):
+                depth -= 1
+            elif tok_string == ':' and not depth:
+                row, col = tok_start
+                break
+        lines = self.lines[self.get_start(node) - 1:row]
+        lines[-1] = lines[-1][:col + 1]
+        return reindent(lines, indent)
+
+    def walk_function(self, node):
+        """Get the statements of a function without nested scopes"""
+        for child in get_nested(node):
+            yield child
+            if not isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                for item in self.walk_function(child):
+                    yield item
+
+    def stub_function(self, node, indent):
+        body_indent = indent + '    '
+        body = []
+        statements = list(self.walk_function(node))
+        is_generator = any(
+            isinstance(item, ast.Yield)
+            for statement in statements
+            for child in ast.iter_child_nodes(statement)
+            if isinstance(child, ast.expr)
+            for item in ast.walk(child))
+        if is_generator:
+            body.append(body_indent + 'yield')
+        else:
+            # All the return statements are kept, they are used by
+            # pylint to infer the result of calls.
+            for statement in statements:
+                if isinstance(statement, ast.Return) and statement.value:
+                    body.extend(self.get_source(statement, body_indent))
+        lines = self.get_header(node, indent) + (
+            body or [body_indent + 'pass'])
+        try:
+            compile('\n'.join(line[len(indent):] for line in lines),
+                    '<stub>', 'exec')
+        except SyntaxError:
+            lines = self.get_header(node, indent) + [body_indent + 'pass']
+        return lines
+
+    def stub_body(self, body, indent, in_class=False):
+        lines = []
+        for node in body:
+            if isinstance(node, ast.FunctionDef):
+                lines.extend(self.stub_function(node, indent))
+            elif isinstance(node, ast.ClassDef):
+                class_lines = self.stub_body(node.body, indent + '    ',
+                                             in_class=True)
+                lines.extend(self.get_header(node, indent) + (
+                    class_lines or [indent + '    pass']))
+            elif isinstance(node, COPY_NODES):
+                lines.extend(self.get_source(node, indent))
+            elif not in_class and isinstance(
+                    node, (ast.TryExcept, ast.TryFinally)) and not [
+                    item for item in self.walk_function(node)
+                    if not isinstance(item, COPY_NODES + (ast.Pass,))]:
+                # e.g. try: import x except ImportError: x = None
+                lines.extend(self.get_source(node, indent))
+        return lines
+
+    def generate(self):
+        lines = self.stub_body(self.tree.body, '')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def get_stub_source(source):
+    """Get stub source code of python `source` code"""
+    return StubGenerator(source).generate()
+
+
+def generate_stubs(server_path, stubs_dir):
+    """Generate stubs of the odoo package of `server_path` in `stubs_dir`
+    :return: Number of modules generated
+    """
+    package = 'odoo' if os.path.isdir(
+        os.path.join(server_path, 'odoo')) else 'openerp'
+    package_path = os.path.join(server_path, package)
+    count = 0
+    for root, dirs, files in os.walk(package_path):
+        rel_root = os.path.relpath(root, server_path)
+        if rel_root == os.path.join(package, 'addons'):
+            # Addons are not part of the api
+            dirs[:] = []
+            files = [fname for fname in files if fname == '__init__.py']
+        for fname in files:
+            if not fname.endswith('.py'):
+                continue
+            stub_path = os.path.join(stubs_dir, rel_root, fname)
+            if not os.path.isdir(os.path.dirname(stub_path)):
+                os.makedirs(os.path.dirname(stub_path))
+            with open(os.path.join(root, fname)) as fsource:
+                source = fsource.read()
+            try:
+                stub = get_stub_source(source)
+            except (SyntaxError, IndexError):
+                stub = ''
+            with open(stub_path, 'w') as fstub:
+                fstub.write(stub)
+            count += 1
+    return count
+
+
+@click.command()
+@click.argument('server_path', type=click.Path(exists=True, file_okay=False))
+@click.argument('stubs_dir', type=click.Path(file_okay=False))
+def main(server_path, stubs_dir):
+    """Generate stubs of odoo package of SERVER_PATH in STUBS_DIR"""
+    count = generate_stubs(server_path, stubs_dir)
+    print("%d odoo stub modules generated in %s" % (count, stubs_dir))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Private PostgreSQL cluster for throwaway test databases.
+The cluster is created with `initdb` in a scratch directory (tmpfs when
+available) and configured for speed over durability: test databases are
+dropped at the end of the build, so crash safety is useless here.
+"""
+
+from __future__ import print_function
+
+import getpass
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+# Settings appended to postgresql.conf of the private cluster
+FAST_SETTINGS = {
+    'fsync': 'off',
+    'full_page_writes': 'off',
+    'synchronous_commit': 'off',
+    'checkpoint_timeout': '30min',
+    'autovacuum': 'off',
+    'shared_buffers': '256MB',
+    'work_mem': '16MB',
+    'maintenance_work_mem': '64MB',
+    'max_connections': '64',
+    'listen_addresses': "''",
+}
+
+
+def get_pg_bin_dir():
+    """Get the directory of PostgreSQL server binaries.
+    `initdb` and `pg_ctl` are not in the PATH on Debian based systems.
+    :return: String with the binaries directory or None to use the PATH
+    """
+    bin_dir = os.environ.get('PG_BIN_DIR')
+    if bin_dir:
+        return bin_dir
+    try:
+        return subprocess.check_output(['pg_config', '--bindir']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_scratch_dir():
+    """Get the base directory for the cluster data
+    Use the `/dev/shm` tmpfs when it exists.
+    :return: String with path of base directory
+    """
+    scratch_dir = os.environ.get('PG_EPHEMERAL_DIR')
+    if scratch_dir:
+        return os.path.expanduser(scratch_dir)
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+class PgCluster(object):
+    def __init__(self, base_dir=None, port=5433, bin_dir=None,
+                 settings=None):
+        """
+        :param base_dir: Directory where the cluster directory is created.
+            Default: temporary directory of the system.
+        :param port: Port number of the cluster. It's only used to name
+            the unix socket because TCP connections are disabled.
+        :param bin_dir: Directory of `initdb` and `pg_ctl` binaries
+        :param settings: Dict with extra postgresql.conf settings
+        """
+        self.base_dir = base_dir
+        self.port = str(port)
+        self.bin_dir = bin_dir
+        self.settings = dict(FAST_SETTINGS, **(settings or {}))
+        self.user = getpass.getuser()
+        self.cluster_dir = None
+
+    @property
+    def data_dir(self):
+        return os.path.join(self.cluster_dir, 'data')
+
+    @property
+    def socket_dir(self):
+        return self.cluster_dir
+
+    def _bin(self, name):
+        if self.bin_dir:
+            return os.path.join(self.bin_dir, name)
+        return name
+
+    def start(self):
+        """Create the cluster, start it and export the libpq environment
+        variables used by `createdb`, `dropdb` and `psql` commands.
+        :return: Dict with db options for the odoo configuration file
+        """
+        self.cluster_dir = tempfile.mkdtemp(prefix='mqt_pg_',
+                                            dir=self.base_dir)
+        print("Creating PostgreSQL cluster in %s" % self.cluster_dir)
+        subprocess.check_call([
+            self._bin('initdb'), '--pgdata', self.data_dir,
+            '--username', self.user, '--auth', 'trust',
+            '--encoding', 'UTF8', '--nosync',
+        ], stdout=open(os.devnull, 'w'))
+        with open(os.path.join(self.data_dir, 'postgresql.conf'),
+                  'a') as fconf:
+            fconf.write('\n# maintainer-quality-tools ephemeral cluster\n')
+            for key, value in sorted(self.settings.items()):
+                fconf.write('%s = %s\n' % (key, value))
+        subprocess.check_call([
+            self._bin('pg_ctl'), 'start', '--pgdata', self.data_dir,
+            '--wait', '--log', os.path.join(self.cluster_dir, 'server.log'),
+            '-o', '-p %s -k %s' % (self.port, self.socket_dir),
+        ])
+        os.environ['PGHOST'] = self.socket_dir
+        os.environ['PGPORT'] = self.port
+        os.environ['PGUSER'] = self.user
+        return {
+            'db_host': self.socket_dir,
+            'db_port': self.port,
+            'db_user': self.user,
+        }
+
+    def stop(self):
+        """Stop the cluster without checkpoint and remove its files"""
+        if not self.cluster_dir:
+            return
+        print("Removing PostgreSQL cluster in %s" % self.cluster_dir)
+        subprocess.call([
+            self._bin('pg_ctl'), 'stop', '--pgdata', self.data_dir,
+            '--mode', 'immediate', '--wait',
+        ])
+        shutil.rmtree(self.cluster_dir, ignore_errors=True)
+        self.cluster_dir = None
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Fast checks of the manifests of the modules before the lint and the tests:
+- Manifests of the repository and of the dependencies of the modules to
+  test are valid python dict literals
+- Modules of the repository are not duplicated in other addons paths
+- Modules of INCLUDE exist and are installable
+- Dependencies of the modules to test exist and are installable,
+  only if the odoo server is installed
+"""
+
+from __future__ import print_function
+
+import ast
+import os
+import sys
+
+from getaddons import is_module
+from test_server import get_addons_path, get_addons_to_check, \
+    get_core_addons_paths, get_server_path, parse_list
+from travis_helpers import fail_msg, red, success_msg, yellow
+
+
+def read_manifest(manifest_path):
+    """Read a manifest without evaluating code
+    :return: Tuple (dict with manifest, error message or None)
+    """
+    try:
+        with open(manifest_path) as fmanifest:
+            manifest = ast.literal_eval(fmanifest.read())
+    except (SyntaxError, ValueError) as error:
+        return {}, "invalid manifest %s: %s" % (manifest_path, error)
+    if not isinstance(manifest, dict):
+        return {}, "invalid manifest %s: it isn't a dict" % manifest_path
+    return manifest, None
+
+
+class ModuleIndex(object):
+    """Modules of the addons paths, the first path with a module is used
+    like odoo does"""
+
+    def __init__(self, addons_paths):
+        # {module name: [(addons path, manifest)]}
+        self.modules = {}
+        # {(addons path, module name): error message of the manifest}
+        self.errors = {}
+        for addons_path in addons_paths:
+            if not os.path.isdir(addons_path):
+                continue
+            for name in sorted(os.listdir(addons_path)):
+                manifest_path = is_module(os.path.join(addons_path, name))
+                if not manifest_path:
+                    continue
+                manifest, error = read_manifest(manifest_path)
+                if error:
+                    self.errors[(addons_path, name)] = error
+                self.modules.setdefault(name, []).append(
+                    (addons_path, manifest))
+
+    def get_manifest(self, name):
+        return self.modules[name][0][1] if name in self.modules else None
+
+    def get_duplicates(self, addons_path):
+        """Get the modules of `addons_path` found in other addons paths
+        :return: Dict {module name: [addons paths]}
+        """
+        return dict(
+            (name, [path for path, _ in entries])
+            for name, entries in self.modules.items()
+            if len(entries) > 1 and
+            addons_path in [path for path, _ in entries])
+
+    def get_dependencies(self, names):
+        """:return: Set of modules `names` found and their dependencies,
+        recursively"""
+        dependencies = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in dependencies or name not in self.modules:
+                continue
+            dependencies.add(name)
+            pending.extend(self.get_manifest(name).get('depends', []))
+        return dependencies
+
+    def get_manifest_errors(self, addons_path, names):
+        """Get the errors of the manifests of the modules of `addons_path`
+        and of the modules used by `names`, the errors of other modules
+        don't change the tests
+        :return: List of strings with errors
+        """
+        used = set((self.modules[name][0][0], name)
+                   for name in self.get_dependencies(names))
+        return [error for (path, name), error in sorted(self.errors.items())
+                if path == addons_path or (path, name) in used]
+
+    def get_missing_dependencies(self, names):
+        """Resolve the dependencies of modules `names` recursively
+        :return: List of strings with errors of the missing or not
+            installable dependencies
+        """
+        errors = []
+        checked = set()
+        pending = [(name, None) for name in names]
+        while pending:
+            name, parent = pending.pop()
+            if name in checked:
+                continue
+            checked.add(name)
+            manifest = self.get_manifest(name)
+            required_by = " required by %s" % parent if parent else ""
+            if manifest is None:
+                errors.append("module %s not found%s" % (name, required_by))
+                continue
+            if not manifest.get('installable', True):
+                errors.append("module %s is not installable%s" % (
+                    name, required_by))
+            pending.extend((depend, name)
+                           for depend in manifest.get('depends', []))
+        return errors
+
+
+def main(argv=None):
+    travis_home = os.environ.get("HOME", "~/")
+    travis_dependencies_dir = os.path.join(travis_home, 'dependencies')
+    travis_build_dir = os.path.abspath(
+        os.environ.get("TRAVIS_BUILD_DIR", "../.."))
+    odoo_include = os.environ.get("INCLUDE")
+    odoo_exclude = os.environ.get("EXCLUDE")
+    odoo_version = os.environ.get("VERSION")
+    if not odoo_version and argv and len(argv) > 1:
+        odoo_version = argv[1]
+    odoo_full = os.environ.get("ODOO_REPO", "odoo/odoo")
+    server_path = get_server_path(odoo_full, odoo_version or '',
+                                  travis_home)
+    server_installed = odoo_version and os.path.isdir(server_path)
+    addons_paths = get_addons_path(
+        travis_dependencies_dir, travis_build_dir, server_path).split(',')
+    addons_paths.extend(get_core_addons_paths(server_path))
+    index = ModuleIndex(addons_paths)
+    addons_to_check = get_addons_to_check(
+        travis_build_dir, odoo_include, odoo_exclude)
+    errors = index.get_manifest_errors(travis_build_dir, addons_to_check)
+
+    for name, paths in sorted(index.get_duplicates(travis_build_dir).items()):
+        errors.append("module %s found in several addons paths: %s" % (
+            name, ', '.join(paths)))
+
+    for name in parse_list(odoo_include) if odoo_include else []:
+        manifest = index.get_manifest(name)
+        if manifest is None:
+            errors.append("module %s of INCLUDE not found" % name)
+        elif not manifest.get('installable', True):
+            errors.append("module %s of INCLUDE is not installable" % name)
+
+    if server_installed:
+        # Modules of INCLUDE not found or not installable already failed
+        tested_addons = [
+            name for name in addons_to_check
+            if name in index.modules and
+            index.get_manifest(name).get('installable', True)]
+        errors.extend(index.get_missing_dependencies(tested_addons))
+    else:
+        print(yellow("Odoo server not found in %s, dependencies of the "
+                     "modules are not checked" % server_path))
+
+    for error in errors:
+        print(red(error))
+    print("Preflight checks of %d manifests: %s" % (
+        sum(len(entries) for entries in index.modules.values()),
+        fail_msg if errors else success_msg))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
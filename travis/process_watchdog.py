@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Watchdog to stop hung odoo server processes of the tests.
+"""
+
+from __future__ import print_function
+
+import os
+import signal
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Names of the wrapper processes of the server started by `unbuffer`
+WRAPPER_NAMES = ('unbuffer', 'expect', 'tclsh')
+
+
+def get_process_tree(pid):
+    """:return: List of psutil.Process with process `pid` and its
+    descendants, empty without psutil"""
+    if psutil is None:
+        return []
+    try:
+        process = psutil.Process(pid)
+        return [process] + process.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def is_alive(process):
+    try:
+        return process.status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+def signal_process_tree(pipe, descendants, signum):
+    try:
+        os.killpg(pipe.pid, signum)
+    except OSError:
+        pass
+    for process in descendants:
+        try:
+            process.send_signal(signum)
+        except psutil.Error:
+            pass
+
+
+def kill_process_tree(pipe, timeout=10):
+    """Terminate the process of `pipe` and all its descendants.
+    The process group of `pipe`, created with `os.setsid`, doesn't include
+    the server started by `unbuffer`: `expect` runs it in its own session
+    and pty, so the descendants are also signaled one by one with psutil.
+    :param pipe: subprocess.Popen object
+    :param timeout: Seconds to wait before killing the processes
+    """
+    # Read before signaling, the descendants lose their parent when it ends
+    descendants = get_process_tree(pipe.pid)[1:]
+    signal_process_tree(pipe, descendants, signal.SIGTERM)
+    for _ in range(timeout * 10):
+        if pipe.poll() is not None and \
+                not any(is_alive(process) for process in descendants):
+            return
+        time.sleep(0.1)
+    signal_process_tree(pipe, descendants, signal.SIGKILL)
+
+
+def dump_stacks(pipe):
+    """Send SIGQUIT to the odoo server processes of `pipe`, odoo handles it
+    logging the stack of all its threads (`dumpstacks`).
+    `unbuffer` is not signaled because SIGQUIT would kill it, and its
+    command line also has `openerp-server`.
+    :return: True if a process was signaled
+    """
+    signaled = False
+    for process in get_process_tree(pipe.pid):
+        try:
+            if 'openerp-server' in ' '.join(process.cmdline()) and \
+                    not process.name().startswith(WRAPPER_NAMES):
+                process.send_signal(signal.SIGQUIT)
+                signaled = True
+        except psutil.Error:
+            pass
+    return signaled
+
+
+class Watchdog(threading.Thread):
+    """Stop the process of `pipe` when it runs for too long or when it
+    doesn't write output for too long. The stacks of its threads are
+    dumped in the log before stopping it.
+    The reason is saved in `expired`: 'timeout', 'deadline' or 'output'.
+    """
+
+    def __init__(self, pipe, timeout=None, output_timeout=None,
+                 deadline=None, dump_delay=5):
+        """
+        :param pipe: subprocess.Popen object started with `os.setsid`
+        :param timeout: Maximum seconds of execution of the process
+        :param output_timeout: Maximum seconds without output
+        :param deadline: Time (`time.time()`) to stop the process
+        :param dump_delay: Seconds to wait the dump of stacks
+        """
+        super(Watchdog, self).__init__()
+        self.daemon = True
+        self.pipe = pipe
+        self.start_time = self.last_output = time.time()
+        self.timeout = timeout
+        self.output_timeout = output_timeout
+        self.deadline = deadline
+        self.dump_delay = dump_delay
+        self.expired = None
+        self._stop_event = threading.Event()
+
+    def touch(self):
+        """Register an output of the process"""
+        self.last_output = time.time()
+
+    def check(self):
+        now = time.time()
+        if self.deadline and now > self.deadline:
+            return 'deadline'
+        if self.timeout and now - self.start_time > self.timeout:
+            return 'timeout'
+        if self.output_timeout and \
+                now - self.last_output > self.output_timeout:
+            return 'output'
+        return None
+
+    def run(self):
+        while not self._stop_event.wait(1):
+            self.expired = self.check()
+            if self.expired:
+                print("Watchdog: %s expired, stopping the server" %
+                      self.expired)
+                if dump_stacks(self.pipe):
+                    time.sleep(self.dump_delay)
+                kill_process_tree(self.pipe)
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
@@ -10,6 +10,8 @@ import click
 import pylint.lint
 
 import getaddons
+import travis_helpers
+from governor import get_governor
 
 CLICK_DIR = click.Path(exists=True, dir_okay=True, resolve_path=True)
 
@@ -51,13 +53,20 @@ def get_subpaths(paths):
     return subpaths
 
 
-def run_pylint(paths, cfg, beta_msgs=None, sys_paths=None, extra_params=None):
+def run_pylint(paths, cfg, beta_msgs=None, sys_paths=None, extra_params=None,
+               ast_cache_dir=None, timer=None, jobs=None):
     """Execute pylint command from original python library
     :param paths: List of paths of python modules to check pylint
     :param cfg: String name of pylint configuration file
     :param sys_paths: List of paths to append to sys path
     :param extra_params: List of parameters extra to append
         in pylint command
+    :param ast_cache_dir: Directory to save astroid trees of modules
+        outside of `paths` to reuse them in next runs
+    :param timer: lint_timing.LintTimer object to measure the time by
+        file and by checker
+    :param jobs: Number of pylint processes, or "auto" to use the
+        processes that the machine can run
     :return: Dict with python linter stats
     """
     if sys_paths is None:
@@ -71,11 +80,32 @@ def run_pylint(paths, cfg, beta_msgs=None, sys_paths=None, extra_params=None):
     if not subpaths:
         raise UserWarning("Python modules not found in paths"
                           " {paths}".format(paths=paths))
+    if jobs == 'auto':
+        jobs = get_governor().get_workers('pylint', len(subpaths))
+    if jobs and int(jobs) > 1 and not timer:
+        # The timer only measures the main process
+        cmd.append('--jobs=%d' % int(jobs))
     cmd.extend(subpaths)
-    pylint_res = pylint.lint.Run(cmd, exit=False)
+    if timer:
+        with timer:
+            pylint_res = run(cmd, ast_cache_dir, paths)
+    else:
+        pylint_res = run(cmd, ast_cache_dir, paths)
     return pylint_res.linter.stats
 
 
+def run(cmd, ast_cache_dir=None, paths=None):
+    """Run pylint with the command line arguments `cmd`
+    :return: pylint.lint.Run object
+    """
+    if ast_cache_dir:
+        from astroid_cache import AstroidDiskCache
+        with AstroidDiskCache(ast_cache_dir, os.environ.get('VERSION'),
+                              paths):
+            return pylint.lint.Run(cmd, exit=False)
+    return pylint.lint.Run(cmd, exit=False)
+
+
 @click.command()
 @click.option('paths', '--path', envvar='TRAVIS_BUILD_DIR',
               multiple=True, type=CLICK_DIR, required=True,
@@ -91,20 +121,53 @@ def run_pylint(paths, cfg, beta_msgs=None, sys_paths=None, extra_params=None):
                    "in pylint command")
 @click.option('--msgs-no-count', '-msgs-no-count', multiple=True,
               help="List of messages that will not add to the failure count.")
+@click.option('--ast-cache-dir', envvar='PYLINT_AST_CACHE_DIR',
+              help="Directory to save the astroid trees of modules "
+                   "outside of paths to check, to reuse them in next runs.")
+@click.option('--timing', envvar='PYLINT_TIMING', is_flag=True,
+              help="Show the slowest files and checkers.")
+@click.option('--timing-top', envvar='PYLINT_TIMING_TOP', default=10,
+              help="Number of slowest files and checkers to show.")
+@click.option('--timing-file', envvar='PYLINT_TIMING_FILE',
+              help="Json file to save the time by file and by checker.")
+@click.option('--file-time-budget', envvar='PYLINT_FILE_TIME_BUDGET',
+              type=float,
+              help="Warn about files checked in more than these seconds.")
+@click.option('--jobs', '-j', envvar='PYLINT_JOBS',
+              help="Number of pylint processes, \"auto\" to use the "
+                   "processes that the machine can run.")
 def main(paths, config_file, msgs_no_count=None,
-         sys_paths=None, extra_params=None):
+         sys_paths=None, extra_params=None, ast_cache_dir=None,
+         timing=False, timing_top=10, timing_file=None,
+         file_time_budget=None, jobs=None):
     """Script to run pylint command with additional params
     to check fails of odoo modules.
     If expected errors is equal to count fails found then
     this program exit with zero otherwise exit with counted fails"""
+    timer = None
+    if timing or timing_file or file_time_budget:
+        from lint_timing import LintTimer
+        timer = LintTimer()
     try:
         stats = run_pylint(
             list(paths), config_file.name,
             sys_paths=sys_paths,
-            extra_params=extra_params)
+            extra_params=extra_params,
+            ast_cache_dir=ast_cache_dir,
+            timer=timer,
+            jobs=jobs)
         count_fails = get_count_fails(stats, list(msgs_no_count))
     except UserWarning:
         count_fails = -1
+    if timer:
+        timer.print_top(timing_top)
+        if timing_file:
+            timer.save(timing_file)
+        if file_time_budget:
+            for fpath, seconds in timer.get_over_budget(file_time_budget):
+                print(travis_helpers.yellow(
+                    "Pylint took %.2fs in %s, more than the budget of %.2fs"
+                    % (seconds, fpath, file_time_budget)))
     return count_fails
 
 
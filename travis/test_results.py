@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Store of the test runs passed, to skip the modules not changed since.
+A test run is identified by a Merkle hash of the files of its modules, of
+the files of their dependencies (recursively, including the core modules),
+of the files of the odoo server out of its addons and of the test options.
+A test run passed with the same hash can't give another result, except for
+external resources used by the tests.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+IGNORE_EXTENSIONS = ('.pyc', '.pyo')
+IGNORE_DIRS = ('.git',)
+
+
+def get_tree_hash(path, exclude_dirs=None):
+    """Hash of the names and the content of the files of a directory
+    :param exclude_dirs: List of absolute paths of directories ignored
+    :return: String with sha1 hex digest
+    """
+    exclude_dirs = set(os.path.abspath(item) for item in exclude_dirs or [])
+    sha1 = hashlib.sha1()
+    path = os.path.abspath(path)
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(
+            item for item in dirs if item not in IGNORE_DIRS and
+            os.path.join(root, item) not in exclude_dirs)
+        for fname in sorted(files):
+            if fname.endswith(IGNORE_EXTENSIONS):
+                continue
+            fpath = os.path.join(root, fname)
+            if not os.path.isfile(fpath):
+                continue
+            with open(fpath, 'rb') as fobj:
+                file_hash = hashlib.sha1(fobj.read()).hexdigest()
+            sha1.update('%s %s\n' % (os.path.relpath(fpath, path),
+                                     file_hash))
+    return sha1.hexdigest()
+
+
+class ResultStore(object):
+    def __init__(self, store_dir, modules, server_path, options):
+        """
+        :param store_dir: Directory of the results
+        :param modules: Dict {module name: (addons path, manifest)}
+        :param server_path: Server path
+        :param options: List of strings with options of the tests
+        """
+        self.store_dir = os.path.expanduser(store_dir)
+        self.modules = modules
+        self.server_path = server_path
+        self.options = options
+        self._server_hash = None
+        self._module_hashes = {}
+
+    def get_server_hash(self):
+        """Hash of the server without its addons, they are hashed as
+        dependencies of the modules"""
+        if self._server_hash is None:
+            self._server_hash = get_tree_hash(self.server_path, [
+                os.path.join(self.server_path, 'addons'),
+                os.path.join(self.server_path, 'openerp', 'addons'),
+                os.path.join(self.server_path, 'odoo', 'addons')])
+        return self._server_hash
+
+    def get_module_hash(self, name, parents=()):
+        """Merkle hash of a module and its dependencies
+        :return: String with sha1 hex digest or None if the module or a
+            dependency is not found
+        """
+        if name in self._module_hashes:
+            return self._module_hashes[name]
+        if name not in self.modules or name in parents:
+            return None
+        path, manifest = self.modules[name]
+        items = [name, get_tree_hash(os.path.join(path, name))]
+        for depend in sorted(manifest.get('depends', [])):
+            depend_hash = self.get_module_hash(depend, parents + (name,))
+            if depend_hash is None:
+                return None
+            items.append(depend_hash)
+        self._module_hashes[name] = hashlib.sha1(
+            '\n'.join(items)).hexdigest()
+        return self._module_hashes[name]
+
+    def get_key(self, to_test):
+        """Key of a test run
+        :param to_test: String with comma separated modules tested
+        :return: String with key or None if it can't be computed
+        """
+        items = [self.get_server_hash()] + self.options
+        for name in sorted(to_test.split(',')):
+            module_hash = self.get_module_hash(name)
+            if module_hash is None:
+                return None
+            items.append(module_hash)
+        return hashlib.sha1('\n'.join(items)).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.store_dir, key[:2], key + '.json')
+
+    def has_passed(self, to_test):
+        """:return: Dict with the result saved of the test run or None"""
+        key = self.get_key(to_test)
+        if not key or not os.path.isfile(self.get_path(key)):
+            return None
+        with open(self.get_path(key)) as fresult:
+            return json.load(fresult)
+
+    def save_passed(self, to_test, **values):
+        key = self.get_key(to_test)
+        if not key:
+            return
+        path = self.get_path(key)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        values.update(modules=to_test,
+                      date=time.strftime('%Y-%m-%d %H:%M:%S'))
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'w') as fresult:
+            json.dump(values, fresult, indent=4, sort_keys=True)
+        os.rename(tmp_path, path)
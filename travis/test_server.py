@@ -2,19 +2,35 @@
 
 from __future__ import print_function
 
+import ast
+import atexit
+import json
+import pstats
 import re
 import os
-import shutil
 import subprocess
 import sys
-from getaddons import get_addons, get_modules, is_installable_module
-from travis_helpers import success_msg, fail_msg
-
-
-def has_test_errors(fname, dbname, odoo_version, check_loaded=True):
+import time
+from db_pool import DbPool, copy_attachments
+from governor import get_governor
+from getaddons import get_addons, get_modules, is_installable_module, \
+    is_module
+from log_stats import COLOR_REGEX, QueryCounter, get_durations, \
+    get_log_start_regex, get_over_budget, get_query_budgets, \
+    get_regressions, load_baseline, median, merge_durations, \
+    parse_log_records, print_query_counts, print_slowest, save_baseline
+from process_watchdog import Watchdog, kill_process_tree
+from pg_cluster import PgCluster, get_pg_bin_dir, get_scratch_dir
+from test_results import ResultStore
+from travis_helpers import success_msg, fail_msg, green, yellow
+
+
+def get_errors_patterns(odoo_version):
     """
-    Check a list of log lines for test errors.
+    Get the rules to find errors in log records.
     Extension point to detect false positives.
+    :return: Tuple of lists (errors_ignore, errors_report) of callables
+        that receive a log record
     """
     # Rules defining checks to perform
     # this can be
@@ -53,40 +69,20 @@ def has_test_errors(fname, dbname, odoo_version, check_loaded=True):
 
     make_pattern_list_callable(errors_ignore)
     make_pattern_list_callable(errors_report)
+    return errors_ignore, errors_report
 
+
+def has_test_errors(fname, dbname, odoo_version, check_loaded=True):
+    """
+    Check a list of log lines for test errors.
+    Extension point to detect false positives.
+    """
     print("-"*10)
-    # Read log file removing ASCII color escapes:
-    # http://serverfault.com/questions/71285
-    color_regex = re.compile(r'\x1B\[([0-9]{1,2}(;[0-9]{1,2})?)?[m|K]')
-    log_start_regex = re.compile(
-        r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} \d+ (?P<loglevel>\w+) '
-        '(?P<db>(%s)|([?])) (?P<logger>\S+): (?P<message>.*)$' % dbname)
-    log_records = []
-    last_log_record = dict.fromkeys(log_start_regex.groupindex.keys())
-    with open(fname) as log:
-        for line in log:
-            line = color_regex.sub('', line)
-            match = log_start_regex.match(line)
-            if match:
-                last_log_record = match.groupdict()
-                log_records.append(last_log_record)
-            else:
-                last_log_record['message'] = '%s\n%s' % (
-                    last_log_record['message'], line.rstrip('\n')
-                )
-    errors = []
-    for log_record in log_records:
-        ignore = False
-        for ignore_pattern in errors_ignore:
-            if ignore_pattern(log_record):
-                ignore = True
-                break
-        if ignore:
-            break
-        for report_pattern in errors_report:
-            if report_pattern(log_record):
-                errors.append(log_record)
-                break
+    log_records = parse_log_records(fname, dbname)
+    # Same rules as the check of FAIL_FAST
+    error_checker = LogErrorChecker(dbname, odoo_version)
+    errors = [log_record for log_record in log_records
+              if error_checker.is_error(log_record)]
 
     if check_loaded:
         if not [r for r in log_records if 'Modules loaded.' == r['message']]:
@@ -99,6 +95,47 @@ def has_test_errors(fname, dbname, odoo_version, check_loaded=True):
     return len(errors)
 
 
+class LogErrorChecker(object):
+    """Check the log records of the server output while it's received"""
+
+    def __init__(self, dbname, odoo_version):
+        self.errors_ignore, self.errors_report = get_errors_patterns(
+            odoo_version)
+        self.log_start_regex = get_log_start_regex(dbname)
+        self.log_record = None
+        self.ignored = False
+
+    def is_error(self, log_record):
+        """Check a log record with the rules of `get_errors_patterns`, the
+        records after the first record ignored are not checked"""
+        if log_record is None or self.ignored:
+            return False
+        if any(pattern(log_record) for pattern in self.errors_ignore):
+            self.ignored = True
+            return False
+        return any(pattern(log_record) for pattern in self.errors_report)
+
+    def feed(self, line):
+        """Process a line of the server output
+        :return: The previous log record if it's an error, because
+            a log record is complete when the next one starts.
+        """
+        line = COLOR_REGEX.sub('', line)
+        match = self.log_start_regex.match(line)
+        if not match:
+            if self.log_record is not None:
+                self.log_record['message'] = '%s\n%s' % (
+                    self.log_record['message'], line.rstrip('\n'))
+            return None
+        log_record, self.log_record = self.log_record, match.groupdict()
+        return log_record if self.is_error(log_record) else None
+
+    def close(self):
+        """:return: The last log record if it's an error"""
+        log_record, self.log_record = self.log_record, None
+        return log_record if self.is_error(log_record) else None
+
+
 def parse_list(comma_sep_list):
     return [x.strip() for x in comma_sep_list.split(',')]
 
@@ -136,6 +173,73 @@ def get_addons_path(travis_dependencies_dir, travis_build_dir, server_path):
     return addons_path
 
 
+def get_core_addons_paths(server_path):
+    """Addons paths of the server package, always used by odoo"""
+    return [os.path.join(server_path, package, 'addons')
+            for package in ['openerp', 'odoo']
+            if os.path.isdir(os.path.join(server_path, package, 'addons'))]
+
+
+def get_modules_manifests(addons_path, server_path):
+    """
+    Read the manifests of the modules used by the server
+    :param addons_path: string with a comma separated list of addons paths
+    :param server_path: Server path
+    :return: Dict {module name: (addons path, manifest)}, the first path
+        with a module is used like odoo does
+    """
+    modules = {}
+    for path in get_core_addons_paths(server_path) + addons_path.split(','):
+        if not os.path.isdir(path):
+            continue
+        for name in os.listdir(path):
+            manifest_path = is_module(os.path.join(path, name))
+            if not manifest_path or name in modules:
+                continue
+            try:
+                with open(manifest_path) as fmanifest:
+                    manifest = ast.literal_eval(fmanifest.read())
+            except (SyntaxError, ValueError):
+                manifest = {}
+            modules[name] = (path, manifest)
+    return modules
+
+
+def get_minimal_addons_path(addons_path, addons_list, server_path,
+                            keep_paths=None):
+    """
+    Remove from addons path the paths without modules needed by the
+    modules to test: their dependencies, recursively, and the auto_install
+    modules whose dependencies are all installed.
+    :param addons_path: string with a comma separated list of addons paths
+    :param addons_list: list of the modules to test
+    :param server_path: Server path
+    :param keep_paths: list of addons paths always kept
+    :return: Addons path, the same if a needed module isn't found
+    """
+    paths = addons_path.split(',')
+    modules = get_modules_manifests(addons_path, server_path)
+    needed = set()
+    pending = list(addons_list) + ['base']
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            if name not in modules:
+                return addons_path
+            needed.add(name)
+            pending.extend(modules[name][1].get('depends', []))
+        if not pending:
+            pending.extend(
+                auto_name for auto_name, (_, manifest) in modules.items()
+                if auto_name not in needed and
+                manifest.get('auto_install') and
+                manifest.get('installable', True) and
+                set(manifest.get('depends', [])) <= needed)
+    needed_paths = set(modules[name][0] for name in needed)
+    needed_paths.update(keep_paths or [])
+    return ','.join(path for path in paths if path in needed_paths)
+
+
 def get_addons_to_check(travis_build_dir, odoo_include, odoo_exclude):
     """
     Get the list of modules that need to be installed
@@ -157,6 +261,36 @@ def get_addons_to_check(travis_build_dir, odoo_include, odoo_exclude):
     return addons_list
 
 
+def get_shard_addons(addons_list, shard_index, shard_total,
+                     durations=None):
+    """
+    Split the modules to test between shards with a similar total duration
+    using the longest-processing-time-first rule: from the slowest module,
+    each module is added to the shard with less total duration.
+    Modules without duration use the median of known durations, then all
+    the modules have the same duration if there aren't durations.
+    :param addons_list: List of modules to test
+    :param shard_index: Index of shard to get, from 0 to shard_total - 1
+    :param shard_total: Number of shards
+    :param durations: Dict {module: seconds}
+    :return: List of modules to test of the shard, in the original order
+    """
+    durations = durations or {}
+    known_durations = [durations[addon] for addon in addons_list
+                       if addon in durations]
+    default_duration = median(known_durations) if known_durations else 1.0
+    weights = dict((addon, float(durations.get(addon, default_duration)))
+                   for addon in addons_list)
+    # [total duration, shard index, modules]
+    shards = [[0.0, index, set()] for index in range(shard_total)]
+    for addon in sorted(addons_list, key=lambda x: (-weights[x], x)):
+        shard = min(shards, key=lambda x: (x[0], x[1]))
+        shard[0] += weights[addon]
+        shard[2].add(addon)
+    return [addon for addon in addons_list
+            if addon in shards[shard_index][2]]
+
+
 def get_test_dependencies(addons_path, addons_list):
     """
     Get the list of core and external modules dependencies
@@ -247,13 +381,19 @@ def create_server_conf(data, version):
     fconf.close()
 
 
-def copy_attachments(dbtemplate, dbdest, data_dir):
-    attach_dir = os.path.join(os.path.expanduser(data_dir), 'filestore')
-    attach_tmpl_dir = os.path.join(attach_dir, dbtemplate)
-    attach_dest_dir = os.path.join(attach_dir, dbdest)
-    if os.path.isdir(attach_tmpl_dir) and not os.path.isdir(attach_dest_dir):
-        print("copy", attach_tmpl_dir, attach_dest_dir)
-        shutil.copytree(attach_tmpl_dir, attach_dest_dir)
+def print_profile_stats(profile_files, fname, top=20):
+    """Print the functions with more cumulative time of all profiles
+    :param profile_files: List of paths of cProfile files to aggregate
+    :param fname: String with path of file to save aggregated profile
+    :param top: Number of functions to print
+    """
+    profile_files = [pfile for pfile in profile_files
+                     if os.path.isfile(pfile)]
+    if not profile_files:
+        return
+    stats = pstats.Stats(*profile_files)
+    stats.dump_stats(fname)
+    stats.sort_stats('cumulative').print_stats(top)
 
 
 def main(argv=None):
@@ -273,6 +413,44 @@ def main(argv=None):
     instance_alive = str2bool(os.environ.get('INSTANCE_ALIVE'))
     unbuffer = str2bool(os.environ.get('UNBUFFER', True))
     data_dir = os.environ.get("DATA_DIR", '~/data_dir')
+    pg_ephemeral = str2bool(os.environ.get('PG_EPHEMERAL'))
+    db_pool_size = os.environ.get('DB_POOL_SIZE', '0')
+    if db_pool_size != 'auto':
+        db_pool_size = int(db_pool_size)
+    coverage_addons = str2bool(os.environ.get('COVERAGE_ADDONS'))
+    minimal_addons_path = str2bool(os.environ.get('MINIMAL_ADDONS_PATH'))
+    test_results_cache = os.environ.get('TEST_RESULTS_CACHE')
+    template_only = str2bool(os.environ.get('TEMPLATE_ONLY'))
+    durations_top = int(os.environ.get('DURATIONS_TOP', 10))
+    durations_baseline = os.environ.get('DURATIONS_BASELINE')
+    durations_beta = str2bool(os.environ.get('DURATIONS_BETA'))
+    durations_baseline_update = str2bool(
+        os.environ.get('DURATIONS_BASELINE_UPDATE'))
+    sql_query_count = str2bool(os.environ.get('SQL_QUERY_COUNT'))
+    sql_query_budgets = os.environ.get('SQL_QUERY_BUDGETS')
+    # The server kept alive is not profiled, its profile is not aggregated
+    profile = str2bool(os.environ.get('PROFILE')) and not instance_alive
+    try:
+        shard_index = int(os.environ.get('SHARD_INDEX', 0))
+        shard_total = int(os.environ.get('SHARD_TOTAL', 1))
+    except ValueError:
+        shard_index = shard_total = -1
+    if shard_total < 1 or not 0 <= shard_index < shard_total:
+        print(fail_msg, "SHARD_TOTAL must be a number greater than 0 and "
+              "SHARD_INDEX a number from 0 to SHARD_TOTAL - 1, found "
+              "SHARD_INDEX=%s SHARD_TOTAL=%s" % (
+                  os.environ.get('SHARD_INDEX'),
+                  os.environ.get('SHARD_TOTAL')))
+        return 1
+    # Expected errors need a full run to be counted
+    fail_fast = str2bool(os.environ.get('FAIL_FAST')) and not expected_errors
+    module_timeout = int(os.environ.get('MODULE_TIMEOUT', 0))
+    output_timeout = int(os.environ.get('OUTPUT_TIMEOUT', 0))
+    tests_deadline = None
+    if os.environ.get('TESTS_TIMEOUT'):
+        tests_deadline = time.time() + int(os.environ['TESTS_TIMEOUT'])
+    use_watchdog = module_timeout or output_timeout or tests_deadline
+    profile_dir = os.path.abspath(os.environ.get('PROFILE_DIR', 'profiles'))
     if not odoo_version:
         # For backward compatibility, take version from parameter
         # if it's not globally set
@@ -295,13 +473,42 @@ def main(argv=None):
     addons_path = get_addons_path(travis_dependencies_dir,
                                   travis_build_dir,
                                   server_path)
-    create_server_conf({
+    server_conf = {
         'addons_path': addons_path,
         'data_dir': data_dir,
-    }, odoo_version)
+    }
+    if pg_ephemeral:
+        # Private cluster without durability for throwaway databases
+        pg_cluster = PgCluster(
+            get_scratch_dir(), os.environ.get('PG_EPHEMERAL_PORT', 5433),
+            get_pg_bin_dir())
+        server_conf.update(pg_cluster.start())
+        atexit.register(pg_cluster.stop)
     tested_addons_list = get_addons_to_check(travis_build_dir,
                                              odoo_include,
                                              odoo_exclude)
+    if minimal_addons_path:
+        # Odoo scans the manifests of all the addons paths in each start
+        addons_path = server_conf['addons_path'] = get_minimal_addons_path(
+            addons_path, tested_addons_list, server_path,
+            [travis_build_dir, server_path + "/addons"])
+    create_server_conf(server_conf, odoo_version)
+    other_shards_addons = []
+    if shard_total > 1:
+        shard_durations = {}
+        if os.environ.get('SHARD_DURATIONS'):
+            shard_durations = dict(
+                (addon, median(history))
+                for addon, history in load_baseline(os.path.join(
+                    travis_build_dir, os.environ['SHARD_DURATIONS'])
+                ).get('module', {}).items()
+                if history)
+        shard_addons_list = get_shard_addons(
+            tested_addons_list, shard_index, shard_total, shard_durations)
+        other_shards_addons = list(
+            set(tested_addons_list) - set(shard_addons_list))
+        tested_addons_list = shard_addons_list
+        print("Shard %d of %d" % (shard_index, shard_total))
     tested_addons = ','.join(tested_addons_list)
 
     print("Working in %s" % travis_build_dir)
@@ -316,24 +523,46 @@ def main(argv=None):
     dbtemplate = "openerp_template"
     preinstall_modules = get_test_dependencies(addons_path,
                                                tested_addons_list)
-    preinstall_modules = list(set(preinstall_modules) - set(get_modules(
-        os.environ.get('TRAVIS_BUILD_DIR'))))
+    # Modules tested in other shards are installed in the template
+    # to avoid running their tests again.
+    preinstall_modules = list(set(preinstall_modules) - (set(get_modules(
+        os.environ.get('TRAVIS_BUILD_DIR'))) - set(other_shards_addons)))
     print("Modules to preinstall: %s" % preinstall_modules)
     setup_server(dbtemplate, odoo_unittest, tested_addons, server_path,
                  addons_path, install_options, preinstall_modules, unbuffer)
+    if template_only:
+        # The template is used by a next run with the tests
+        return 0
 
     # Running tests
     database = "openerp_test"
 
-    cmd_odoo_test = ["coverage", "run",
-                     "%s/openerp-server" % server_path,
-                     "-d", database,
-                     "--stop-after-init",
-                     "--log-level", test_loglevel,
-                     ]
+    cmd_coverage = ["coverage", "run"]
+    if profile:
+        # Profile instead of coverage, the output file is set by test
+        cmd_coverage = ["python", "-m", "cProfile", "--outfile", None]
+        if not os.path.isdir(profile_dir):
+            os.makedirs(profile_dir)
+    elif coverage_addons:
+        # Trace just the tested addons, with a data file by run
+        # to combine them before the report.
+        cmd_coverage += [
+            "--parallel-mode",
+            "--source=" + ','.join(
+                os.path.abspath(os.path.join(travis_build_dir, addon))
+                for addon in tested_addons_list),
+        ]
+    cmd_odoo_test = cmd_coverage + [
+        "%s/openerp-server" % server_path,
+        "-d", database,
+        "--stop-after-init",
+        "--log-level", test_loglevel,
+    ]
 
     if test_loghandler is not None:
         cmd_odoo_test += ['--log-handler', test_loghandler]
+    if sql_query_count:
+        cmd_odoo_test += ['--log-handler', 'openerp.sql_db:DEBUG']
     cmd_odoo_test += options + ["--init", None]
 
     if odoo_unittest:
@@ -350,25 +579,70 @@ def main(argv=None):
         to_test_list = [tested_addons]
         commands = ((cmd_odoo_test, True),
                     )
+    result_store = None
+    reused = []
+    if test_results_cache and not instance_alive and not expected_errors:
+        # Test runs already passed with the same modules, dependencies,
+        # server and options
+        result_store = ResultStore(
+            test_results_cache,
+            get_modules_manifests(addons_path, server_path), server_path,
+            [odoo_version, str(odoo_unittest)] + options + install_options +
+            sorted(preinstall_modules))
+        for to_test in to_test_list:
+            result = result_store.has_passed(to_test)
+            if result:
+                print(green("Reusing the test result of %s passed on %s"
+                            % (to_test, result['date'])))
+                reused.append(to_test)
+    to_run_list = [to_test for to_test in to_test_list
+                   if to_test not in reused]
     all_errors = []
     counted_errors = 0
-    for to_test in to_test_list:
+    durations = {}
+    query_counts = {}
+    db_pool = None
+    if db_pool_size and not instance_alive and to_run_list:
+        # Clone and drop test databases out of the critical path
+        governor = get_governor()
+        if db_pool_size == 'auto':
+            db_pool_size = governor.get_workers('db_clone', len(to_run_list))
+        db_pool = DbPool(dbtemplate, len(to_run_list), db_pool_size,
+                         data_dir, database, governor).start()
+    profile_files = []
+    stop_tests = False
+    skipped = []
+    for index, to_test in enumerate(to_run_list):
+        if tests_deadline and time.time() > tests_deadline:
+            print(fail_msg, "TESTS_TIMEOUT expired")
+            skipped = to_run_list[index:]
+            break
         print("\nTesting %s:" % to_test)
         db_odoo_created = False
-        try:
-            db_odoo_created = subprocess.call(
-                ["createdb", "-T", dbtemplate, database])
-            copy_attachments(dbtemplate, database, data_dir)
-        except subprocess.CalledProcessError:
-            db_odoo_created = True
+        if profile:
+            profile_files.append(os.path.join(
+                profile_dir,
+                '%s.prof' % (to_test if odoo_unittest else 'all_modules')))
+            cmd_odoo_test[cmd_odoo_test.index('--outfile') + 1] = \
+                profile_files[-1]
+        if db_pool:
+            database = db_pool.acquire()
+        else:
+            try:
+                db_odoo_created = subprocess.call(
+                    ["createdb", "-T", dbtemplate, database])
+                copy_attachments(dbtemplate, database, data_dir)
+            except subprocess.CalledProcessError:
+                db_odoo_created = True
         for command, check_loaded in commands:
             if db_odoo_created and instance_alive:
                 # If exists database of odoo test
                 # then start server with regular command without tests params
-                rm_items = [
-                    'coverage', 'run', '--stop-after-init',
+                rm_items = cmd_coverage + [
+                    '--stop-after-init',
                     '--test-enable', '--init', None,
                     '--log-handler', 'openerp.tools.yaml_import:DEBUG',
+                    'openerp.sql_db:DEBUG',
                 ]
                 command_call = [item
                                 for item in commands[0][0]
@@ -376,20 +650,61 @@ def main(argv=None):
                     ['--db-filter=^%s$' % database]
             else:
                 command[-1] = to_test
+                command[command.index('-d') + 1] = database
                 # Run test command; unbuffer keeps output colors
                 command_call = (["unbuffer"] if unbuffer else []) + command
             print(' '.join(command_call))
             pipe = subprocess.Popen(command_call,
                                     stderr=subprocess.STDOUT,
-                                    stdout=subprocess.PIPE)
+                                    stdout=subprocess.PIPE,
+                                    # Own process group to kill it
+                                    preexec_fn=os.setsid
+                                    if fail_fast or use_watchdog else None)
+            watchdog = None
+            if use_watchdog:
+                watchdog = Watchdog(pipe, module_timeout, output_timeout,
+                                    tests_deadline)
+                watchdog.start()
+            query_counter = QueryCounter() if sql_query_count else None
+            error_checker = LogErrorChecker(database, odoo_version) \
+                if fail_fast else None
+            error_found = None
             with open('stdout.log', 'w') as stdout:
                 for line in iter(pipe.stdout.readline, ''):
+                    if watchdog:
+                        # The queries counted are also server output
+                        watchdog.touch()
+                    if query_counter and query_counter.feed(line):
+                        # Count the queries without logging them
+                        continue
                     stdout.write(line)
                     print(line.strip())
+                    error_found = error_checker and error_checker.feed(line)
+                    if error_found:
+                        break
+            if error_checker and not error_found:
+                error_found = error_checker.close()
+            if error_found:
+                print(fail_msg, "FAIL_FAST: stopping the tests after "
+                      "the error: %s" % error_found['message'])
+                kill_process_tree(pipe)
+                stop_tests = True
             returncode = pipe.wait()
+            if watchdog:
+                watchdog.stop()
+            merge_durations(durations, get_durations(
+                parse_log_records('stdout.log', database)))
+            if query_counter:
+                merge_durations(query_counts, query_counter.counts)
             # Find errors, except from failed mails
             errors = has_test_errors(
                 "stdout.log", database, odoo_version, check_loaded)
+            if watchdog and watchdog.expired:
+                print(fail_msg, "Server stopped by the watchdog, "
+                      "%s timeout expired" % watchdog.expired)
+                errors += 1
+                if watchdog.expired == 'deadline':
+                    stop_tests = True
             if returncode != 0:
                 all_errors.append(to_test)
                 print(fail_msg, "Command exited with code %s" % returncode)
@@ -402,14 +717,66 @@ def main(argv=None):
                 counted_errors += errors
                 all_errors.append(to_test)
                 print(fail_msg, "Found %d lines with errors" % errors)
-        if not instance_alive:
+            if stop_tests:
+                break
+        if db_pool:
+            db_pool.release(database)
+        elif not instance_alive:
             # Don't drop the database if will be used later.
             subprocess.call(["dropdb", database])
+        if result_store and to_test not in all_errors:
+            result_store.save_passed(to_test, version=odoo_version)
+        if stop_tests:
+            skipped = to_run_list[index + 1:]
+            break
+    if db_pool:
+        db_pool.close()
+
+    with open('durations.json', 'w') as fdurations:
+        json.dump(durations, fdurations, indent=4, sort_keys=True)
+    if durations_top:
+        print_slowest(durations, durations_top)
+    regressions = []
+    if durations_baseline:
+        durations_baseline = os.path.join(travis_build_dir,
+                                          durations_baseline)
+        baseline = load_baseline(durations_baseline)
+        regressions = get_regressions(
+            durations, baseline,
+            float(os.environ.get('DURATIONS_TOLERANCE', 0.5)),
+            float(os.environ.get('DURATIONS_MIN_DELTA', 1.0)),
+            parse_list(os.environ.get('DURATIONS_GATE', 'module')))
+        for category, name, seconds, expected in regressions:
+            print(yellow("Slower %s %s: %.3fs, baseline %.3fs" % (
+                category, name, seconds, expected)))
+        if regressions and durations_beta:
+            print(yellow("Duration checks are still in beta, "
+                         "they won't affect your build status for now"))
+            regressions = []
+    if profile:
+        print_profile_stats(profile_files,
+                            os.path.join(profile_dir, 'aggregated.prof'),
+                            int(os.environ.get('PROFILE_TOP', 20)))
+    over_budget = []
+    if sql_query_count:
+        with open('queries.json', 'w') as fqueries:
+            json.dump(query_counts, fqueries, indent=4, sort_keys=True)
+        print_query_counts(query_counts, durations_top or 10)
+        if sql_query_budgets:
+            over_budget = get_over_budget(query_counts, get_query_budgets(
+                os.path.join(travis_build_dir, sql_query_budgets)))
+        for category, name, queries, budget in over_budget:
+            print(fail_msg, "%s %s: %d SQL queries, budget %d" % (
+                category, name, queries, budget))
 
     print('Module test summary')
     for to_test in to_test_list:
         if to_test in all_errors:
             print(fail_msg, to_test)
+        elif to_test in skipped:
+            print(yellow("Skipped"), to_test)
+        elif to_test in reused:
+            print(success_msg, to_test, green("(reused result)"))
         else:
             print(success_msg, to_test)
     if expected_errors and counted_errors != expected_errors:
@@ -418,6 +785,16 @@ def main(argv=None):
         return 1
     elif counted_errors != expected_errors:
         return 1
+    if regressions:
+        print(fail_msg, "Found %d duration regressions" % len(regressions))
+        return 1
+    if over_budget:
+        print(fail_msg, "Found %d SQL query budgets exceeded"
+              % len(over_budget))
+        return 1
+    if durations_baseline and durations_baseline_update:
+        save_baseline(durations_baseline, baseline, durations,
+                      int(os.environ.get('DURATIONS_HISTORY', 5)))
     # if we get here, all is OK
     return 0
 
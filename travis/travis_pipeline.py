@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Run the install and the checks of a build as a graph of stages.
+
+Usage: travis_pipeline.py [VERSION]
+
+Each stage starts when the stages it depends on are finished, so the
+stages bound by the network (download of the odoo server, clone of the
+dependencies) run while the lint checks run:
+
+    lint_deps -> lint
+    download ------------------> template -> tests
+    clone -> pip (after lint_deps) -^       ^
+    setup (after lint_deps) ----------------'
+
+The output of each stage is saved in a log file and printed when the stage
+ends. The stages of the lint and of the tests are selected with
+`LINT_CHECK` and `TESTS` like `travis_run_tests`. VERSION is only used if
+`VERSION` isn't set in the environment.
+"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from governor import get_governor
+from travis_helpers import fail_msg, red, success_msg, yellow
+
+TRAVIS_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class Stage(object):
+    def __init__(self, name, commands, depends=(), env=None):
+        """
+        :param name: Name of the stage
+        :param commands: List of commands run one after the other
+        :param depends: Names of the stages to finish before this stage
+        :param env: Dict with environment variables of the commands,
+            variables with None value are removed
+        """
+        self.name = name
+        self.commands = commands
+        self.depends = list(depends)
+        self.env = env or {}
+        # None: pending, True: success, False: failed or skipped
+        self.result = None
+        self.skipped = False
+        self.duration = 0.0
+        self.log_path = None
+
+    def get_environ(self):
+        environ = dict(os.environ)
+        for key, value in self.env.items():
+            if value is None:
+                environ.pop(key, None)
+            else:
+                environ[key] = value
+        return environ
+
+    def run(self, log_dir):
+        start = time.time()
+        self.log_path = os.path.join(log_dir, '%s.log' % self.name)
+        with open(self.log_path, 'w') as flog:
+            returncode = 0
+            for command in self.commands:
+                flog.write('$ %s\n' % ' '.join(command))
+                flog.flush()
+                returncode = subprocess.call(
+                    command, stdout=flog, stderr=subprocess.STDOUT,
+                    env=self.get_environ())
+                if returncode:
+                    flog.write('Command exited with code %s\n' % returncode)
+                    break
+        self.duration = time.time() - start
+        self.result = not returncode
+
+
+class Pipeline(object):
+    def __init__(self, stages, log_dir=None, keepalive=60):
+        """
+        :param stages: List of Stage objects, in order of priority
+        :param log_dir: Directory of the log files of the stages
+        :param keepalive: Seconds between messages of the stages running,
+            travis stops the builds without output
+        """
+        self.stages = stages
+        self.log_dir = log_dir or tempfile.mkdtemp(prefix='pipeline-')
+        self.keepalive = keepalive
+        self.running = {}
+        self.condition = threading.Condition()
+        self.governor = get_governor()
+
+    def get_stage(self, name):
+        return next(stage for stage in self.stages if stage.name == name)
+
+    def get_ready_stages(self):
+        """Get the pending stages whose dependencies succeeded, and mark as
+        skipped the stages with a dependency failed"""
+        ready = []
+        for stage in self.stages:
+            if stage.result is not None or stage.name in self.running:
+                continue
+            results = [self.get_stage(name).result
+                       for name in stage.depends]
+            if False in results:
+                stage.result, stage.skipped = False, True
+                print(yellow("Stage %s skipped" % stage.name))
+            elif None not in results:
+                ready.append(stage)
+        return ready
+
+    def _run_stage(self, stage):
+        try:
+            stage.run(self.log_dir)
+        except Exception as error:
+            print(error)
+            stage.result = False
+        with self.condition:
+            del self.running[stage.name]
+            self.condition.notify()
+
+    def print_stage(self, stage):
+        print("======== Stage %s (%.1fs) ========" % (
+            stage.name, stage.duration))
+        with open(stage.log_path) as flog:
+            for line in flog:
+                print(line.rstrip('\n'))
+        print(stage.name, success_msg if stage.result else fail_msg)
+        sys.stdout.flush()
+
+    def run(self):
+        """Run the stages
+        :return: True if all the stages succeeded
+        """
+        printed = set()
+        last_output = time.time()
+        with self.condition:
+            while True:
+                for stage in self.get_ready_stages():
+                    if self.running and self.governor.is_memory_low():
+                        # Wait for the stages running to free memory
+                        break
+                    print("Starting stage %s" % stage.name)
+                    thread = threading.Thread(target=self._run_stage,
+                                              args=(stage,))
+                    self.running[stage.name] = thread
+                    thread.start()
+                for stage in self.stages:
+                    if stage.result is not None and not stage.skipped and \
+                            stage.name not in printed:
+                        printed.add(stage.name)
+                        self.print_stage(stage)
+                        last_output = time.time()
+                if not self.running:
+                    break
+                if time.time() - last_output >= self.keepalive:
+                    print("Stages running: %s" % ', '.join(
+                        sorted(self.running)))
+                    sys.stdout.flush()
+                    last_output = time.time()
+                self.condition.wait(1)
+        self.print_summary()
+        return all(stage.result for stage in self.stages)
+
+    def print_summary(self):
+        print()
+        print("+" + "=" * 39)
+        print("|  Pipeline summary:")
+        print("|" + "-" * 39)
+        for stage in self.stages:
+            if stage.skipped:
+                outcome = yellow("Skipped")
+            else:
+                outcome = success_msg if stage.result else fail_msg
+            print("| {0:<20}{1:>7.1f}s {2}".format(
+                stage.name, stage.duration, outcome))
+        print("+" + "=" * 39)
+
+
+def get_stages(environ):
+    """Get the stages of the build configured by the environment
+    :return: List of Stage objects
+    :raise: ValueError if `VERSION` of the tests isn't set
+    """
+    lint = environ.get('LINT_CHECK') != '0'
+    tests = environ.get('TESTS') == '1' or (
+        environ.get('TESTS') is None and environ.get('LINT_CHECK') != '1')
+    # pip and npm don't support concurrent installs
+    install_depends = ['lint_deps'] if lint else []
+    stages = []
+    if lint:
+        # travis_install_nightly only installs the lint tools
+        stages.append(Stage(
+            'lint_deps',
+            [[os.path.join(TRAVIS_DIR, 'travis_install_nightly')]],
+            env={'LINT_CHECK': '1'}))
+        stages.append(Stage(
+            'lint', [[os.path.join(TRAVIS_DIR, 'travis_run_tests')]],
+            ['lint_deps'],
+            env={'LINT_CHECK': '1', 'TESTS': '0', 'PREFLIGHT': '0',
+                 'TRANSIFEX': '0'}))
+    if not tests:
+        return stages
+    home = environ.get('HOME', '~')
+    odoo_repo = environ.get('ODOO_REPO', 'odoo/odoo')
+    version = environ.get('VERSION')
+    if not version:
+        raise ValueError("VERSION of odoo to test not set, set it in the "
+                         "environment or as first argument")
+    odoo_url = 'https://github.com/%s/archive/%s.tar.gz' % (
+        odoo_repo, version)
+    stages.append(Stage('download', [[
+        sys.executable, os.path.join(TRAVIS_DIR, 'odoo_download.py'),
+        odoo_url, os.path.join(home, '%s-%s' % (
+            odoo_repo.split('/')[1], version))]]))
+    clone_oca_dependencies = os.path.join(TRAVIS_DIR,
+                                          'clone_oca_dependencies')
+    # The requirements are installed by the pip stage
+    stages.append(Stage('clone', [[clone_oca_dependencies]],
+                        env={'DEPENDENCIES_REQUIREMENTS': '0'}))
+    requirements = os.path.join(TRAVIS_DIR, 'requirements.txt')
+    pip_env = {'DEPENDENCIES_REQUIREMENTS': None}
+    pip_commands = [
+        # Force using system site packages
+        ['rm', '-f', os.path.join(
+            environ.get('VIRTUAL_ENV', ''),
+            'lib/python2.7/no-global-site-packages.txt')],
+        ['pip', 'install', '-q', 'QUnitSuite', 'coveralls'],
+    ]
+    if environ.get('WHEELHOUSE'):
+        pip_env['WHEELHOUSE_EXTRA_REQUIREMENTS'] = requirements
+    else:
+        pip_commands.append(
+            ['pip', 'install', '--user', '-q', '-r', requirements])
+    # The repositories are not processed again, only the requirements
+    pip_commands.append([clone_oca_dependencies])
+    stages.append(Stage('pip', pip_commands, ['clone'] + install_depends,
+                        env=pip_env))
+    stages.append(Stage('setup', [
+        ['bash', '-c', 'ln -sf `which nodejs` %s' % os.path.join(
+            TRAVIS_DIR, 'node')],
+        ['npm', 'install', '-g', 'less', 'less-plugin-clean-css'],
+        ['cp', os.path.join(os.path.dirname(TRAVIS_DIR), 'cfg', '.coveragerc'),
+         '.'],
+    ], install_depends))
+    tests_depends = ['setup']
+    if environ.get('PG_EPHEMERAL') == '1':
+        # The cluster of the template is removed at the end of its stage
+        tests_depends.extend(['download', 'pip'])
+    else:
+        # Commands of RUN_COMMAND_MQT are run by the tests stage
+        stages.append(Stage(
+            'template', [[sys.executable,
+                          os.path.join(TRAVIS_DIR, 'test_server.py')]],
+            ['download', 'pip'],
+            env=dict([('TEMPLATE_ONLY', '1')] + [
+                (key, None) for key in environ
+                if key.startswith('RUN_COMMAND_MQT')])))
+        tests_depends.append('template')
+    stages.append(Stage(
+        'tests', [[os.path.join(TRAVIS_DIR, 'travis_run_tests')]],
+        tests_depends, env={'LINT_CHECK': '0', 'TESTS': '1'}))
+    return stages
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    # For backward compatibility, take version from parameter if it's not
+    # globally set, the stages use it from the environment
+    if not os.environ.get('VERSION') and len(argv) > 1:
+        os.environ['VERSION'] = argv[1]
+    try:
+        stages = get_stages(os.environ)
+    except ValueError as error:
+        print(red(str(error)))
+        return 1
+    if not stages:
+        print("Nothing to run")
+        return 0
+    return 0 if Pipeline(stages).run() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
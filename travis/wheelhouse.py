@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Install python requirements from a local wheelhouse.
+
+Usage: wheelhouse.py WHEELHOUSE_DIR REQUIREMENTS_FILE...
+
+The requirements files are merged in one set of requirements, with one
+requirement by project. The wheels of the set and of its dependencies are
+built once with `pip wheel` in a directory of the wheelhouse named by the
+hash of the set, and installed offline from this directory with one
+`pip install` call.
+Requirements without wheels are installed with `pip install -r` of the set.
+If the requirements of a project can't be merged, each file is installed
+with its own `pip install -r` call.
+"""
+
+from __future__ import print_function
+
+import glob
+import hashlib
+import os
+import platform
+import re
+import subprocess
+import sys
+
+import pkg_resources
+
+EGG_REGEX = re.compile(r'#egg=([^&]+)')
+NAME_REGEX = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+
+
+def read_requirements(reqfilename, seen=None):
+    """Read the requirements of a file, including the files of `-r` lines
+    :return: List of strings with requirements
+    """
+    seen = seen if seen is not None else set()
+    reqfilename = os.path.abspath(reqfilename)
+    if reqfilename in seen:
+        return []
+    seen.add(reqfilename)
+    requirements = []
+    with open(reqfilename) as reqfile:
+        for line in reqfile:
+            line = line.split(' #')[0].strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith(('-r ', '--requirement ')):
+                requirements.extend(read_requirements(os.path.join(
+                    os.path.dirname(reqfilename), line.split(None, 1)[1]),
+                    seen))
+                continue
+            requirements.append(line)
+    return requirements
+
+
+def get_requirement_name(requirement):
+    """Get the project name of a requirement, normalized like pip does
+    :return: String with name or None for urls without egg name and options
+    """
+    match = EGG_REGEX.search(requirement)
+    if match:
+        name = match.group(1)
+    elif requirement.startswith('-') or '://' in requirement:
+        return None
+    else:
+        match = NAME_REGEX.match(requirement)
+        if not match:
+            return None
+        name = match.group(0)
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def merge_requirement(requirement, other):
+    """Merge two requirements of the same project, pip < 10 fails with
+    "Double requirement given" for different requirements of a project
+    :return: String with the requirement satisfying both or None if they
+        can't be merged
+    """
+    if requirement == other:
+        return requirement
+    try:
+        parsed = [pkg_resources.Requirement.parse(item)
+                  for item in (requirement, other)]
+    except ValueError:
+        # urls
+        return None
+    if len(set((item.extras, str(getattr(item, 'marker', '')))
+               for item in parsed)) > 1:
+        return None
+    for line, parsed_req, other_req in [
+            (requirement, parsed[0], parsed[1]),
+            (other, parsed[1], parsed[0])]:
+        if not other_req.specs:
+            return line
+        pinned = [version for operator, version in parsed_req.specs
+                  if operator == '==']
+        if pinned and pinned[0] in other_req:
+            return line
+    return None
+
+
+def merge_requirements(reqfilenames):
+    """Merge the requirements of several files
+    :return: Sorted list of strings with one requirement by project or None
+        if the requirements of a project can't be merged
+    """
+    seen = set()
+    # {project name: requirement}
+    merged = {}
+    others = set()
+    for reqfilename in reqfilenames:
+        for requirement in read_requirements(reqfilename, seen):
+            name = get_requirement_name(requirement)
+            if name is None:
+                others.add(requirement)
+                continue
+            merged_requirement = merge_requirement(
+                merged.get(name, requirement), requirement)
+            if merged_requirement is None:
+                print('Requirements %s and %s not merged' % (
+                    merged[name], requirement))
+                return None
+            merged[name] = merged_requirement
+    return sorted(others | set(merged.values()))
+
+
+def get_requirements_hash(requirements):
+    """Hash of the requirements and the python of the wheels"""
+    key = '\n'.join([sys.version.split()[0], platform.machine()] +
+                    requirements)
+    return hashlib.sha1(key).hexdigest()
+
+
+def install_requirements(reqfilenames, wheelhouse_dir, pip='pip'):
+    """Install the requirements of several files with one pip call from
+    the wheels of the wheelhouse, built first if they don't exist
+    :param reqfilenames: List of requirements files
+    :param wheelhouse_dir: Directory of the wheelhouse
+    :param pip: pip command
+    """
+    requirements = merge_requirements(reqfilenames)
+    if requirements is None:
+        for reqfilename in reqfilenames:
+            command = [pip, 'install', '-r', reqfilename]
+            print('Calling %s' % ' '.join(command))
+            subprocess.check_call(command)
+        return
+    if not requirements:
+        return
+    wheels_dir = os.path.join(os.path.expanduser(wheelhouse_dir),
+                              get_requirements_hash(requirements))
+    reqfilename = os.path.join(wheels_dir, 'requirements.txt')
+    complete_marker = os.path.join(wheels_dir, '.complete')
+    if not os.path.isfile(complete_marker):
+        if not os.path.isdir(wheels_dir):
+            os.makedirs(wheels_dir)
+        with open(reqfilename, 'w') as reqfile:
+            reqfile.write('\n'.join(requirements) + '\n')
+        command = [pip, 'wheel', '-q', '-w', wheels_dir, '-r', reqfilename]
+        print('Calling %s' % ' '.join(command))
+        if subprocess.call(command):
+            # Packages without wheels are installed from their sources
+            command = [pip, 'install', '-r', reqfilename]
+            print('Calling %s' % ' '.join(command))
+            subprocess.check_call(command)
+            return
+        open(complete_marker, 'w').close()
+    # The wheels built are the requirements resolved with their
+    # dependencies, urls of requirements are not downloaded again
+    command = [pip, 'install', '--no-index', '--find-links', wheels_dir] + \
+        sorted(glob.glob(os.path.join(wheels_dir, '*.whl')))
+    print('Calling %s' % ' '.join(command))
+    subprocess.check_call(command)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    if len(argv) < 3:
+        print(__doc__)
+        return 1
+    install_requirements(argv[2:], argv[1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())